@@ -0,0 +1,655 @@
+#!/usr/bin/env python
+# coding=utf-8
+
+# Cross Stitch batch runner
+# Created by Tin Tran
+# Comments directed to http://gimplearn.net
+#
+# License: GPLv3
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY# without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# To view a copy of the GNU General Public License
+# visit: http://www.gnu.org/licenses/gpl.html
+#
+# Turns many images into cross stitch patterns without GIMP, spread over a
+# pool of worker processes. Every worker loads the thread catalog once.
+# Takes the options of the plug-in dialog, writes <name>-pattern.png and
+# <name>-threads.txt per image and keeps a journal (one JSON line per job
+# with its timings) in the output directory so an interrupted run picks up
+# where it stopped. With --pages the chart is split into printable pages
+# (<name>-page-001.png, ...) that the pool renders in parallel, so patterns
+# far too big for one image still come out page by page. --svg and --pdf add
+# vector charts that are streamed out as they are generated, --bom json/csv
+# the bill of materials as data for order systems.
+#
+#   python cross_stitch_batch.py photos/ -o patterns/ --blend 3 --colors 24
+#
+# Reading images needs Pillow, without it only binary PPM/PGM files work.
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import struct
+import sys
+import time
+import traceback
+import zlib
+
+from cross_stitch_engine import (
+    DITHERING,
+    PAGE_COLUMNS,
+    PAGE_OVERLAP,
+    PAGE_ROWS,
+    PALETTE_METHODS,
+    STITCH_DIMENSION,
+    chartRows,
+    getCatalog,
+    loadPattern,
+    makePattern,
+    pageLayout,
+    pdfChart,
+    saveBomCSV,
+    saveBomJSON,
+    savePattern,
+    svgChart,
+    useLookupTable,
+)
+
+try:
+    from PIL import Image
+except ImportError:
+    Image = None
+
+IMAGE_EXTENSIONS = (
+    ".png",
+    ".jpg",
+    ".jpeg",
+    ".bmp",
+    ".gif",
+    ".tif",
+    ".tiff",
+    ".webp",
+    ".ppm",
+    ".pgm",
+)
+
+# choices of the plug-in dialog, in dialog order
+BLEND_TYPES = ["none", "2", "3", "4", "5", "6"]
+MATCH_METHODS = ["perceptive", "regular", "delta-e", "ciede2000", "oklab"]
+# scalePixels only tells nearest-pixel sampling from area averaging
+INTERPOLATIONS = ["none", "area"]
+
+JOURNAL_NAME = "cross_stitch_batch.jsonl"
+
+
+# ------------------------------------------------------------------
+# image files
+# ------------------------------------------------------------------
+
+
+def readNetpbm(path):
+    with open(path, "rb") as image_file:
+        data = image_file.read()
+    fields = []
+    position = 0
+    while len(fields) < 4:
+        while position < len(data) and data[position : position + 1].isspace():
+            position += 1
+        if data[position : position + 1] == b"#":
+            position = data.find(b"\n", position)
+            if position < 0:
+                raise ValueError("truncated header")
+            continue
+        start = position
+        while position < len(data) and not data[position : position + 1].isspace():
+            position += 1
+        if position >= len(data):
+            raise ValueError("truncated header")
+        fields.append(data[start:position])
+    magic, width, height, maxval = fields
+    if magic not in (b"P5", b"P6") or int(maxval) != 255:
+        raise ValueError("only 8-bit binary PPM/PGM is supported without Pillow")
+    channels = 3 if magic == b"P6" else 1
+    width, height = int(width), int(height)
+    size = width * height * channels
+    pixels = data[position + 1 : position + 1 + size]
+    if len(pixels) != size:
+        raise ValueError("truncated pixel data")
+    return pixels, width, height, channels
+
+
+# pixels, width, height and channels of an image file
+def readImage(path):
+    if Image is not None:
+        image = Image.open(path)
+        alpha = "A" in image.getbands() or "transparency" in image.info
+        image = image.convert("RGBA" if alpha else "RGB")
+        width, height = image.size
+        return image.tobytes(), width, height, 4 if alpha else 3
+    if os.path.splitext(path)[1].lower() in (".ppm", ".pgm"):
+        return readNetpbm(path)
+    raise ValueError("install Pillow to read " + os.path.basename(path))
+
+
+def pngChunk(png_file, kind, data):
+    png_file.write(struct.pack(">I", len(data)))
+    png_file.write(kind + data)
+    png_file.write(struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF))
+
+
+# write an RGB PNG from an iterable of byte rows, compressing as the rows come
+# in so the image never has to be in memory as a whole
+def writePNG(path, width, height, rows):
+    compressor = zlib.compressobj(6)
+    with open(path, "wb") as png_file:
+        png_file.write(b"\x89PNG\r\n\x1a\n")
+        pngChunk(
+            png_file, b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0)
+        )
+        pending = []
+        size = 0
+        for row in rows:
+            data = compressor.compress(b"\0" + row)  # filter type None
+            if data:
+                pending.append(data)
+                size += len(data)
+            if size >= 1 << 16:
+                pngChunk(png_file, b"IDAT", b"".join(pending))
+                pending, size = [], 0
+        pending.append(compressor.flush())
+        pngChunk(png_file, b"IDAT", b"".join(pending))
+        pngChunk(png_file, b"IEND", b"")
+
+
+def writeText(path, lines):
+    text = "\n".join(lines) + "\n"
+    if not isinstance(text, bytes):
+        text = text.encode("utf-8")
+    with open(path, "wb") as text_file:
+        text_file.write(text)
+
+
+# ------------------------------------------------------------------
+# jobs
+# ------------------------------------------------------------------
+
+
+def parseColor(text):
+    text = text.lstrip("#")
+    if len(text) != 6:
+        raise argparse.ArgumentTypeError("colors are given as #RRGGBB")
+    return tuple(int(text[i : i + 2], 16) for i in (0, 2, 4))
+
+
+def parsePageSize(text):
+    try:
+        columns, rows = [int(size) for size in text.lower().split("x")]
+    except ValueError:
+        raise argparse.ArgumentTypeError("page sizes are given as COLUMNSxROWS")
+    if columns < 1 or rows < 1:
+        raise argparse.ArgumentTypeError("page sizes are given as COLUMNSxROWS")
+    return columns, rows
+
+
+# (job name, image path) of every image of the inputs and manifests. The name
+# is the path relative to its input directory and names the output files.
+def findJobs(inputs, manifests):
+    jobs = []
+    for path in inputs:
+        if os.path.isdir(path):
+            for folder, dirs, files in os.walk(path):
+                dirs.sort()
+                for name in sorted(files):
+                    if os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS:
+                        image_path = os.path.join(folder, name)
+                        jobs.append((os.path.relpath(image_path, path), image_path))
+        else:
+            jobs.append((os.path.basename(path), path))
+    for manifest in manifests:
+        # one image path per line, relative to the manifest, # for comments
+        base = os.path.dirname(os.path.abspath(manifest))
+        with open(manifest) as manifest_file:
+            for line in manifest_file:
+                line = line.strip()
+                if line and not line.startswith("#"):
+                    jobs.append((line, os.path.join(base, line)))
+    return jobs
+
+
+def outputName(job_name):
+    stem = os.path.splitext(job_name)[0]
+    return stem.replace("\\", "_").replace("/", "_").replace(":", "_")
+
+
+# jobs that would write the same output files (and share a journal entry),
+# as lists of their image paths. Names are compared ignoring case, like
+# the file systems of windows and macOS do.
+def outputClashes(jobs):
+    paths = {}
+    for name, path in jobs:
+        paths.setdefault(outputName(name).lower(), []).append(path)
+    return [found for found in paths.values() if len(found) > 1]
+
+
+# settings shared by every job, also what the journal keys finished jobs on
+def jobSettings(options):
+    settings = {
+        "allow_blend": BLEND_TYPES.index(options.blend),
+        "num_colors": options.colors,
+        "quantizer": options.quantizer,
+        "quantize_lab": options.quantize_lab,
+        "dithering": options.dithering,
+        "interpolation": INTERPOLATIONS.index(options.interpolation),
+        "match_method": MATCH_METHODS.index(options.match),
+        "hor_stitches": options.stitches,
+        "stitches_per_square": options.stitches_per_square,
+        "square_grid_color": options.square_grid_color,
+        "stitch_grid_color": options.stitch_grid_color,
+        "cell_size": options.cell_size,
+    }
+    if options.pages:
+        settings["pages"] = list(options.page_size) + [options.page_overlap]
+    if options.svg:
+        settings["svg"] = True
+    if options.pdf:
+        settings["pdf"] = True
+    if options.bom:
+        settings["bom"] = sorted(set(options.bom))
+    return settings
+
+
+def settingsKey(settings):
+    return hashlib.sha1(
+        json.dumps(settings, sort_keys=True).encode("utf-8")
+    ).hexdigest()
+
+
+worker = {}
+
+
+def initWorker(settings, output_dir, lookup_table=False):
+    worker["settings"] = settings
+    worker["output_dir"] = output_dir
+    worker["catalog"] = getCatalog(settings["allow_blend"])
+    if lookup_table:
+        # built by main, every worker maps the same file
+        useLookupTable(
+            worker["catalog"],
+            settings["allow_blend"],
+            settings["match_method"],
+            build=False,
+        )
+    worker["patterns"] = {}
+
+
+def writeChart(path, pattern):
+    settings = worker["settings"]
+    cell_size = settings["cell_size"]
+    writePNG(
+        path,
+        pattern.width * cell_size,
+        pattern.height * cell_size,
+        chartRows(
+            pattern,
+            cell_size,
+            settings["stitches_per_square"],
+            settings["square_grid_color"],
+            settings["stitch_grid_color"],
+        ),
+    )
+
+
+def runJob(job):
+    name, path = job
+    settings = worker["settings"]
+    seconds = {}
+    started = time.time()
+    try:
+        pixels, width, height, channels = readImage(path)
+        seconds["load"] = time.time() - started
+        step = time.time()
+        pattern = makePattern(
+            pixels,
+            width,
+            height,
+            channels,
+            allow_blend=settings["allow_blend"],
+            num_colors=settings["num_colors"],
+            interpolation=settings["interpolation"],
+            match_method=settings["match_method"],
+            hor_stitches=settings["hor_stitches"],
+            catalog=worker["catalog"],
+            quantizer=settings["quantizer"],
+            quantize_lab=settings["quantize_lab"],
+            dithering=settings["dithering"],
+        )
+        seconds["pattern"] = time.time() - step
+        step = time.time()
+        base = os.path.join(worker["output_dir"], outputName(name))
+        pages = None
+        if "pages" in settings:
+            # pages are rendered by runPage from the saved pattern
+            page_columns, page_rows, overlap = settings["pages"]
+            pages = pageLayout(
+                pattern.width,
+                pattern.height,
+                page_columns,
+                page_rows,
+                overlap,
+                settings["stitches_per_square"],
+            )
+            savePattern(base + "-pattern.bin", pattern)
+            page_tasks = [
+                (name, base, number, page) for number, page in enumerate(pages)
+            ]
+        else:
+            writeChart(base + "-pattern.png", pattern)
+            page_tasks = []
+        if settings.get("svg"):
+            with open(base + "-pattern.svg", "wb") as svg_file:
+                svgChart(
+                    pattern,
+                    svg_file,
+                    settings["cell_size"],
+                    settings["stitches_per_square"],
+                    settings["square_grid_color"],
+                    settings["stitch_grid_color"],
+                )
+        if settings.get("pdf"):
+            with open(base + "-pattern.pdf", "wb") as pdf_file:
+                pdfChart(
+                    pattern,
+                    pdf_file,
+                    pages,
+                    stitches_per_square=settings["stitches_per_square"],
+                    square_grid_color=settings["square_grid_color"],
+                    stitch_grid_color=settings["stitch_grid_color"],
+                )
+        writeText(base + "-threads.txt", pattern.threadInfoLines())
+        if "json" in settings.get("bom", []):
+            saveBomJSON(base + "-bom.json", pattern)
+        if "csv" in settings.get("bom", []):
+            saveBomCSV(base + "-bom.csv", pattern)
+        seconds["write"] = time.time() - step
+    except Exception:
+        seconds["total"] = time.time() - started
+        return {
+            "job": name,
+            "status": "error",
+            "error": traceback.format_exc(),
+            "seconds": seconds,
+        }
+    seconds["total"] = time.time() - started
+    return {
+        "job": name,
+        "status": "ok",
+        "threads": len(pattern.threads),
+        "stitches": pattern.totalStitches(),
+        "seconds": seconds,
+        "page_tasks": page_tasks,
+    }
+
+
+# one page of a saved pattern, the pattern file is memory-mapped once per
+# worker so every page only reads its own rows
+def runPage(task):
+    name, base, number, (x, y, width, height) = task
+    started = time.time()
+    try:
+        path = base + "-pattern.bin"
+        if path not in worker["patterns"]:
+            worker["patterns"][path] = loadPattern(path, worker["catalog"])
+        page = worker["patterns"][path].crop(x, y, width, height)
+        writeChart(base + "-page-%03d.png" % (number + 1), page)
+    except Exception:
+        return {
+            "job": name,
+            "status": "error",
+            "error": traceback.format_exc(),
+            "seconds": time.time() - started,
+        }
+    return {"job": name, "status": "ok", "seconds": time.time() - started}
+
+
+# names of the jobs a previous run finished with the same settings
+def finishedJobs(journal_path, key):
+    finished = set()
+    if not os.path.exists(journal_path):
+        return finished
+    with open(journal_path) as journal:
+        for line in journal:
+            try:
+                entry = json.loads(line)
+            except ValueError:  # half written line of a crashed run
+                continue
+            if entry.get("settings") == key and entry.get("status") == "ok":
+                finished.add(entry["job"])
+    return finished
+
+
+def parseArguments(argv):
+    parser = argparse.ArgumentParser(
+        description="Generate cross stitch patterns for many images."
+    )
+    parser.add_argument("inputs", nargs="*", help="image files or directories")
+    parser.add_argument(
+        "-m",
+        "--manifest",
+        action="append",
+        default=[],
+        help="text file listing one image per line",
+    )
+    parser.add_argument("-o", "--output", default="patterns", help="output directory")
+    parser.add_argument(
+        "-j",
+        "--workers",
+        type=int,
+        default=multiprocessing.cpu_count(),
+        help="worker processes (default: one per CPU)",
+    )
+    parser.add_argument(
+        "--restart",
+        action="store_true",
+        help="ignore the journal and redo jobs that already finished",
+    )
+    parser.add_argument(
+        "--blend",
+        choices=BLEND_TYPES,
+        default="none",
+        help="blend type: none or the strands of a two color blend",
+    )
+    parser.add_argument("--colors", type=int, default=8, help="# of colors (2-256)")
+    parser.add_argument(
+        "--quantizer",
+        choices=PALETTE_METHODS,
+        default="wu",
+        help="color reduction (default: wu), k-medoids picks threads directly",
+    )
+    parser.add_argument(
+        "--quantize-lab",
+        action="store_true",
+        help="measure color reduction errors in Lab instead of RGB",
+    )
+    parser.add_argument(
+        "--dithering",
+        choices=DITHERING,
+        default="none",
+        help="dither onto the threads of the pattern (default: none)",
+    )
+    parser.add_argument(
+        "--interpolation",
+        choices=INTERPOLATIONS,
+        default="area",
+        help="none samples the nearest pixel, area (default) averages it",
+    )
+    parser.add_argument("--match", choices=MATCH_METHODS, default="perceptive")
+    parser.add_argument(
+        "--lookup-table",
+        action="store_true",
+        help="match colors with a cached RGB lookup table (built on first use)",
+    )
+    parser.add_argument(
+        "--stitches", type=int, default=100, help="# of stitches horizontally"
+    )
+    parser.add_argument("--stitches-per-square", type=int, default=10)
+    parser.add_argument("--square-grid-color", type=parseColor, default="#000000")
+    parser.add_argument("--stitch-grid-color", type=parseColor, default="#808080")
+    parser.add_argument(
+        "--cell-size",
+        type=int,
+        default=STITCH_DIMENSION,
+        help="chart pixels per stitch",
+    )
+    parser.add_argument(
+        "--svg", action="store_true", help="also write the chart as SVG"
+    )
+    parser.add_argument(
+        "--bom",
+        action="append",
+        choices=["json", "csv"],
+        default=[],
+        help="also write the bill of materials as JSON or CSV (repeatable)",
+    )
+    parser.add_argument(
+        "--pdf",
+        action="store_true",
+        help="also write the chart as PDF, one PDF page per page with --pages",
+    )
+    parser.add_argument(
+        "--pages",
+        action="store_true",
+        help="split the chart into printable pages instead of one image",
+    )
+    parser.add_argument(
+        "--page-size",
+        type=parsePageSize,
+        default=(PAGE_COLUMNS, PAGE_ROWS),
+        help="stitches per page as COLUMNSxROWS (default: %dx%d)"
+        % (PAGE_COLUMNS, PAGE_ROWS),
+    )
+    parser.add_argument(
+        "--page-overlap",
+        type=int,
+        default=PAGE_OVERLAP,
+        help="columns/rows repeated from the next page (default: %d)" % PAGE_OVERLAP,
+    )
+    options = parser.parse_args(argv)
+    if not options.inputs and not options.manifest:
+        parser.error("no images given")
+    if not 2 <= options.colors <= 256:
+        parser.error("--colors must be between 2 and 256")
+    return options
+
+
+def runInline(function, tasks):
+    for task in tasks:
+        yield function(task)
+
+
+def logResult(journal, result, key):
+    result["settings"] = key
+    journal.write(json.dumps(result, sort_keys=True) + "\n")
+    journal.flush()
+    os.fsync(journal.fileno())
+    if result["status"] != "ok":
+        print("error %s\n%s" % (result["job"], result["error"]))
+        return False
+    print(
+        "ok    %s  %.2fs (load %.2fs, pattern %.2fs, write %.2fs)"
+        % (
+            result["job"],
+            result["seconds"]["total"],
+            result["seconds"]["load"],
+            result["seconds"]["pattern"],
+            result["seconds"]["write"],
+        )
+    )
+    return True
+
+
+def main(argv=None):
+    options = parseArguments(sys.argv[1:] if argv is None else argv)
+    settings = jobSettings(options)
+    key = settingsKey(settings)
+    jobs = findJobs(options.inputs, options.manifest)
+    clashes = outputClashes(jobs)
+    if clashes:
+        for paths in clashes:
+            sys.stderr.write("error: same output name for %s\n" % ", ".join(paths))
+        return 2
+    if not os.path.isdir(options.output):
+        os.makedirs(options.output)
+    journal_path = os.path.join(options.output, JOURNAL_NAME)
+    if not options.restart:
+        finished = finishedJobs(journal_path, key)
+        skipped = len([job for job in jobs if job[0] in finished])
+        jobs = [job for job in jobs if job[0] not in finished]
+        if skipped:
+            print("skipping %d jobs finished before" % skipped)
+    print("%d jobs on %d workers" % (len(jobs), options.workers))
+
+    started = time.time()
+    failed = 0
+    if options.lookup_table:
+        useLookupTable(
+            getCatalog(settings["allow_blend"]),
+            settings["allow_blend"],
+            settings["match_method"],
+        )
+    if options.workers > 1 and (len(jobs) > 1 or options.pages):
+        pool = multiprocessing.Pool(
+            options.workers,
+            initWorker,
+            (settings, options.output, options.lookup_table),
+        )
+        run = pool.imap_unordered
+    else:
+        pool = None
+        initWorker(settings, options.output, options.lookup_table)
+        run = runInline
+    # paged jobs wait in pending until all their pages are written
+    pending = {}
+    page_tasks = []
+    with open(journal_path, "a") as journal:
+        for result in run(runJob, jobs):
+            tasks = result.pop("page_tasks", [])
+            if result["status"] == "ok" and tasks:
+                result["pages"] = len(tasks)
+                pending[result["job"]] = (result, [0], tasks[0][1])
+                page_tasks.extend(tasks)
+            elif not logResult(journal, result, key):
+                failed += 1
+        for page in run(runPage, page_tasks):
+            result, done, base = pending[page["job"]]
+            done[0] += 1
+            result["seconds"]["write"] += page["seconds"]
+            result["seconds"]["total"] += page["seconds"]
+            if page["status"] != "ok":
+                result["status"] = "error"
+                result["error"] = page["error"]
+            if done[0] == result["pages"]:
+                os.remove(base + "-pattern.bin")
+                if not logResult(journal, result, key):
+                    failed += 1
+    if pool is not None:
+        pool.close()
+        pool.join()
+    print(
+        "%d done, %d failed in %.1fs"
+        % (len(jobs) - failed, failed, time.time() - started)
+    )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
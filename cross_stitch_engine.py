@@ -0,0 +1,4081 @@
+# coding=utf-8
+
+# Cross Stitch pattern engine
+# Created by Tin Tran
+# Comments directed to http://gimplearn.net
+#
+# License: GPLv3
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY# without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+# GNU General Public License for more details.
+#
+# To view a copy of the GNU General Public License
+# visit: http://www.gnu.org/licenses/gpl.html
+#
+# The pattern pipeline of cross_stitch_tt.py without GIMP: thread catalog,
+# blends, color matching, stitch counting and bill of materials, working on
+# in-memory pixels. Needs nothing but Python (2.7 or 3), numpy makes it a lot
+# faster when installed. The GIMP plug-in is a thin adapter over this module.
+
+import csv
+import hashlib
+import heapq
+import json
+import math
+import os
+import struct
+import sys
+import zlib
+from array import array
+
+try:
+    import numpy as np
+except ImportError:  # GIMP's bundled Python usually comes without numpy
+    np = None
+
+# where progress messages go, the GIMP plug-in points this at pdb.gimp_message
+message_handler = None
+
+
+def message(text):
+    if message_handler is not None:
+        message_handler(text)
+
+
+# symbols drawn on the stitches of each thread, in order of use
+SYM2 = [
+    "0",
+    "1",
+    "2",
+    "3",
+    "4",
+    "5",
+    "6",
+    "7",
+    "8",
+    "9",
+    "A",
+    "B",
+    "C",
+    "D",
+    "E",
+    "F",
+    "10",
+    "11",
+    "12",
+    "13",
+    "14",
+    "15",
+    "16",
+    "17",
+    "18",
+    "19",
+    "1A",
+    "1B",
+    "1C",
+    "1D",
+    "1E",
+    "1F",
+    "20",
+    "21",
+    "22",
+    "23",
+    "24",
+    "25",
+    "26",
+    "27",
+    "28",
+    "29",
+    "2A",
+    "2B",
+    "2C",
+    "2D",
+    "2E",
+    "2F",
+    "30",
+    "31",
+    "32",
+    "33",
+    "34",
+    "35",
+    "36",
+    "37",
+    "38",
+    "39",
+    "3A",
+    "3B",
+    "3C",
+    "3D",
+    "3E",
+    "3F",
+    "40",
+    "41",
+    "42",
+    "43",
+    "44",
+    "45",
+    "46",
+    "47",
+    "48",
+    "49",
+    "4A",
+    "4B",
+    "4C",
+    "4D",
+    "4E",
+    "4F",
+    "50",
+    "51",
+    "52",
+    "53",
+    "54",
+    "55",
+    "56",
+    "57",
+    "58",
+    "59",
+    "5A",
+    "5B",
+    "5C",
+    "5D",
+    "5E",
+    "5F",
+    "60",
+    "61",
+    "62",
+    "63",
+    "64",
+    "65",
+    "66",
+    "67",
+    "68",
+    "69",
+    "6A",
+    "6B",
+    "6C",
+    "6D",
+    "6E",
+    "6F",
+    "70",
+    "71",
+    "72",
+    "73",
+    "74",
+    "75",
+    "76",
+    "77",
+    "78",
+    "79",
+    "7A",
+    "7B",
+    "7C",
+    "7D",
+    "7E",
+    "7F",
+    "80",
+    "81",
+    "82",
+    "83",
+    "84",
+    "85",
+    "86",
+    "87",
+    "88",
+    "89",
+    "8A",
+    "8B",
+    "8C",
+    "8D",
+    "8E",
+    "8F",
+    "90",
+    "91",
+    "92",
+    "93",
+    "94",
+    "95",
+    "96",
+    "97",
+    "98",
+    "99",
+    "9A",
+    "9B",
+    "9C",
+    "9D",
+    "9E",
+    "9F",
+    "A0",
+    "A1",
+    "A2",
+    "A3",
+    "A4",
+    "A5",
+    "A6",
+    "A7",
+    "A8",
+    "A9",
+    "AA",
+    "AB",
+    "AC",
+    "AD",
+    "AE",
+    "AF",
+    "B0",
+    "B1",
+    "B2",
+    "B3",
+    "B4",
+    "B5",
+    "B6",
+    "B7",
+    "B8",
+    "B9",
+    "BA",
+    "BB",
+    "BC",
+    "BD",
+    "BE",
+    "BF",
+    "C0",
+    "C1",
+    "C2",
+    "C3",
+    "C4",
+    "C5",
+    "C6",
+    "C7",
+    "C8",
+    "C9",
+    "CA",
+    "CB",
+    "CC",
+    "CD",
+    "CE",
+    "CF",
+    "D0",
+    "D1",
+    "D2",
+    "D3",
+    "D4",
+    "D5",
+    "D6",
+    "D7",
+    "D8",
+    "D9",
+    "DA",
+    "DB",
+    "DC",
+    "DD",
+    "DE",
+    "DF",
+    "E0",
+    "E1",
+    "E2",
+    "E3",
+    "E4",
+    "E5",
+    "E6",
+    "E7",
+    "E8",
+    "E9",
+    "EA",
+    "EB",
+    "EC",
+    "ED",
+    "EE",
+    "EF",
+    "F0",
+    "F1",
+    "F2",
+    "F3",
+    "F4",
+    "F5",
+    "F6",
+    "F7",
+    "F8",
+    "F9",
+    "FA",
+    "FB",
+    "FC",
+    "FD",
+    "FE",
+    "FF",
+]
+SYM = [
+    "☀",
+    "☁",
+    "☂",
+    "★",
+    "☆",
+    "☇",
+    "☈",
+    "☉",
+    "☊",
+    "☋",
+    "☌",
+    "☍",
+    "☎",
+    "☏",
+    "☐",
+    "☑",
+    "☒",
+    "☓",
+    "☔",
+    "☕",
+    "☖",
+    "☗",
+    "☘",
+    "☚",
+    "☛",
+    "☜",
+    "☝",
+    "☞",
+    "☟",
+    "G",
+    "☠",
+    "☡",
+    "☢",
+    "☣",
+    "☤",
+    "☥",
+    "☦",
+    "☧",
+    "☨",
+    "☩",
+    "☪",
+    "☫",
+    "☬",
+    "☭",
+    "☮",
+    "☯",
+    "S",
+    "☰",
+    "☸",
+    "☹",
+    "☺",
+    "☻",
+    "☼",
+    "☽",
+    "☾",
+    "☿",
+    "H",
+    "♀",
+    "♁",
+    "♂",
+    "♃",
+    "♄",
+    "♅",
+    "♆",
+    "♇",
+    "♈",
+    "♉",
+    "♊",
+    "♋",
+    "♌",
+    "♍",
+    "♎",
+    "♏",
+    "I",
+    "♐",
+    "♑",
+    "♒",
+    "♓",
+    "♔",
+    "♕",
+    "♖",
+    "♗",
+    "♘",
+    "♙",
+    "♚",
+    "♛",
+    "♜",
+    "♝",
+    "♞",
+    "♟",
+    "J",
+    "♠",
+    "♡",
+    "♢",
+    "♣",
+    "♤",
+    "♥",
+    "♦",
+    "♧",
+    "♨",
+    "♩",
+    "♪",
+    "♫",
+    "♬",
+    "♭",
+    "♮",
+    "♯",
+    "K",
+    "♰",
+    "♱",
+    "♲",
+    "♳",
+    "♺",
+    "♻",
+    "♼",
+    "♽",
+    "♾",
+    "♿",
+    "L",
+    "⚀",
+    "⚁",
+    "⚂",
+    "⚃",
+    "⚄",
+    "⚅",
+    "⚆",
+    "⚇",
+    "⚈",
+    "⚉",
+    "⚌",
+    "⚏",
+    "M",
+    "⚐",
+    "⚑",
+    "⚒",
+    "⚓",
+    "⚔",
+    "⚕",
+    "⚖",
+    "⚗",
+    "⚘",
+    "⚙",
+    "⚚",
+    "⚛",
+    "⚜",
+    "⚝",
+    "⚞",
+    "⚟",
+    "N",
+    "⚠",
+    "⚡",
+    "⚢",
+    "⚣",
+    "⚤",
+    "⚥",
+    "⚦",
+    "⚧",
+    "⚨",
+    "⚩",
+    "⚪",
+    "⚫",
+    "⚬",
+    "⚭",
+    "⚮",
+    "⚯",
+    "P",
+    "⚰",
+    "⚱",
+    "⚲",
+    "⚳",
+    "⚴",
+    "⚵",
+    "⚶",
+    "⚷",
+    "⚸",
+    "⚹",
+    "⚺",
+    "⚻",
+    "⚼",
+    "⚽",
+    "⚾",
+    "⚿",
+    "R",
+    "⛀",
+    "⛁",
+    "⛂",
+    "⛃",
+    "⛄",
+    "⛅",
+    "⛆",
+    "⛇",
+    "⛈",
+    "⛉",
+    "⛊",
+    "⛋",
+    "⛌",
+    "⛍",
+    "⛎",
+    "⛏",
+    "T",
+    "⛐",
+    "⛑",
+    "⛒",
+    "⛓",
+    "⛔",
+    "⛕",
+    "⛖",
+    "⛗",
+    "⛘",
+    "⛙",
+    "⛚",
+    "⛛",
+    "⛜",
+    "⛝",
+    "⛞",
+    "⛟",
+    "U",
+    "⛠",
+    "⛡",
+    "⛢",
+    "⛣",
+    "⛤",
+    "⛨",
+    "⛩",
+    "⛪",
+    "⛫",
+    "⛬",
+    "⛭",
+    "⛮",
+    "⛯",
+    "V",
+    "⛰",
+    "⛱",
+    "⛲",
+    "⛳",
+    "⛴",
+    "⛵",
+    "⛶",
+    "⛷",
+    "⛸",
+    "⛹",
+    "⛺",
+    "⛻",
+    "⛼",
+    "⛽",
+    "⛾",
+    "⛿",
+]
+SYMBOLS = SYM + SYM2
+
+
+# linear light of every 8-bit sRGB channel value, so conversions of 8-bit
+# colors look channels up instead of raising them to the 2.4th power
+def srgbLinear(c):
+    c = c / 255.0
+    return ((c + 0.055) / 1.055) ** 2.4 if (c > 0.04045) else (c / 12.92)
+
+
+SRGB_LINEAR = [srgbLinear(c) for c in range(0, 256)]
+
+
+def linearRGB(rgb):
+    try:
+        return [SRGB_LINEAR[rgb[0]], SRGB_LINEAR[rgb[1]], SRGB_LINEAR[rgb[2]]]
+    except (IndexError, TypeError):  # not 8-bit integers
+        return [srgbLinear(c) for c in rgb]
+
+
+def linearRGBArray(rgb):
+    rgb = np.asarray(rgb)
+    if rgb.dtype.kind in "ui":
+        return np.asarray(SRGB_LINEAR)[rgb]
+    c = rgb.astype(np.float64) / 255.0
+    return np.where(c > 0.04045, ((c + 0.055) / 1.055) ** 2.4, c / 12.92)
+
+
+def rgb2lab(rgb):
+    r, g, b = linearRGB(rgb)
+    x = (r * 0.4124 + g * 0.3576 + b * 0.1805) / 0.95047
+    y = (r * 0.2126 + g * 0.7152 + b * 0.0722) / 1.00000
+    z = (r * 0.0193 + g * 0.1192 + b * 0.9505) / 1.08883
+    x = x ** (1 / 3.0) if (x > 0.008856) else (7.787 * x) + 16 / 116.0
+    y = y ** (1 / 3.0) if (y > 0.008856) else (7.787 * y) + 16 / 116.0
+    z = z ** (1 / 3.0) if (z > 0.008856) else (7.787 * z) + 16 / 116.0
+    return [(116.0 * y) - 16.0, 500.0 * (x - y), 200.0 * (y - z)]
+
+
+def deltaE(labA, labB):
+    deltaL = labA[0] - labB[0]
+    deltaA = labA[1] - labB[1]
+    deltaB = labA[2] - labB[2]
+    c1 = (labA[1] * labA[1] + labA[2] * labA[2]) ** 0.5
+    c2 = (labB[1] * labB[1] + labB[2] * labB[2]) ** 0.5
+    deltaC = c1 - c2
+    deltaH = deltaA * deltaA + deltaB * deltaB - deltaC * deltaC
+    deltaH = 0 if (deltaH < 0) else (deltaH) ** 0.5
+    sc = 1.0 + 0.045 * c1
+    sh = 1.0 + 0.015 * c1
+    deltaLKlsl = deltaL / (1.0)
+    deltaCkcsc = deltaC / (sc)
+    deltaHkhsh = deltaH / (sh)
+    i = deltaLKlsl * deltaLKlsl + deltaCkcsc * deltaCkcsc + deltaHkhsh * deltaHkhsh
+    return 0 if (i < 0) else (i) ** 0.5
+
+
+# per channel weights of the "Perceptive" match method
+PERCEPTIVE_WEIGHTS = (0.3, 0.59, 0.11)
+
+# match methods in the order of the plug-in's option: 0 Perceptive (weighted
+# RGB), 1 Regular (RGB), 2 Delta-E (CIE94 style), 3 CIEDE2000 and 4 OKLab.
+# Delta-E and CIEDE2000 measure in Lab and their distances aren't squared,
+# the others are plain squared distances in their working space.
+LAB_METHODS = (2, 3)
+# methods whose working space has lightness as its first axis
+LIGHTNESS_METHODS = (2, 3, 4)
+
+# how many distances the vectorized matcher computes at once (keeps memory
+# bounded when the catalog holds tens of thousands of blends)
+MATCH_CHUNK = 1 << 21
+
+
+# (n, 3) Lab array of the catalog colors, built once per catalog so Delta-E
+# matching doesn't convert the same thread over and over for every color.
+def catalogLab(catalog):
+    if catalog.lab is None:
+        catalog.lab = rgb2labArray(catalog.rgbArray())
+    return catalog.lab
+
+
+# linear sRGB to D65 normalized XYZ, one row per channel
+SRGB_XYZ = (
+    (0.4124 / 0.95047, 0.2126, 0.0193 / 1.08883),
+    (0.3576 / 0.95047, 0.7152, 0.1192 / 1.08883),
+    (0.1805 / 0.95047, 0.0722, 0.9505 / 1.08883),
+)
+
+
+def rgb2labArray(rgb):
+    # vectorized rgb2lab for a (..., 3) array of colors, integer arrays are
+    # taken as 8-bit and linearized through SRGB_LINEAR
+    return linear2labArray(linearRGBArray(rgb))
+
+
+# whole 8-bit (..., 3) image, e.g. height x width x 3, to a float32 Lab array
+# of the same shape in one go
+def imageLab(rgb):
+    table = np.asarray(SRGB_LINEAR, dtype=np.float32)
+    return linear2labArray(table[np.asarray(rgb, dtype=np.uint8)], np.float32)
+
+
+def linear2labArray(linear, dtype=None):
+    xyz = np.dot(linear, np.asarray(SRGB_XYZ, dtype=dtype))
+    xyz = np.where(xyz > 0.008856, np.cbrt(xyz), (7.787 * xyz) + 16 / 116.0)
+    lab = np.empty(xyz.shape, dtype=dtype)
+    lab[..., 0] = (116.0 * xyz[..., 1]) - 16.0
+    lab[..., 1] = 500.0 * (xyz[..., 0] - xyz[..., 1])
+    lab[..., 2] = 200.0 * (xyz[..., 1] - xyz[..., 2])
+    return lab
+
+
+# OKLab (Ottosson 2020): linear sRGB to cone responses, a cube root and a
+# second matrix. Perceptually about as even as CIE94 with plain euclidean
+# distances, L runs from 0 to 1.
+OKLAB_LMS = (
+    (0.4122214708, 0.5363325363, 0.0514459929),
+    (0.2119034982, 0.6806995451, 0.1073969566),
+    (0.0883024619, 0.2817188376, 0.6299787005),
+)
+OKLAB_LAB = (
+    (0.2104542553, 0.7936177850, -0.0040720468),
+    (1.9779984951, -2.4285922050, 0.4505937099),
+    (0.0259040371, 0.7827717662, -0.8086757660),
+)
+
+
+def rgb2oklab(rgb):
+    r, g, b = linearRGB(rgb)
+    l, m, s = [(row[0] * r + row[1] * g + row[2] * b) ** (1 / 3.0) for row in OKLAB_LMS]
+    return [row[0] * l + row[1] * m + row[2] * s for row in OKLAB_LAB]
+
+
+def rgb2oklabArray(rgb):
+    # vectorized rgb2oklab for a (..., 3) array of colors
+    lms = np.cbrt(np.dot(linearRGBArray(rgb), np.array(OKLAB_LMS).T))
+    return np.dot(lms, np.array(OKLAB_LAB).T)
+
+
+# (n, 3) OKLab array of the catalog colors, like catalogLab
+def catalogOklab(catalog):
+    if catalog.oklab is None:
+        catalog.oklab = rgb2oklabArray(catalog.rgbArray())
+    return catalog.oklab
+
+
+# precomputed working space coordinates of the catalog colors for the match
+# methods that convert colors (Lab, OKLab), None for the RGB ones
+def catalogPoints(catalog, match_method):
+    if match_method in LAB_METHODS:
+        return catalogLab(catalog)
+    if match_method == 4:
+        return catalogOklab(catalog)
+    return None
+
+
+def deltaEArray(labA, labB):
+    # deltaE between every row of labA (n, 3) and every row of labB (m, 3)
+    return deltaEPairs(labA[:, None], labB[None, :])
+
+
+def deltaEPairs(labA, labB):
+    # deltaE between matching Lab colors of two broadcastable (..., 3) arrays
+    deltaL = labA[..., 0] - labB[..., 0]
+    deltaA = labA[..., 1] - labB[..., 1]
+    deltaB = labA[..., 2] - labB[..., 2]
+    c1 = np.sqrt(labA[..., 1] ** 2 + labA[..., 2] ** 2)
+    c2 = np.sqrt(labB[..., 1] ** 2 + labB[..., 2] ** 2)
+    deltaC = c1 - c2
+    deltaH = np.maximum(deltaA * deltaA + deltaB * deltaB - deltaC * deltaC, 0)
+    sc = 1.0 + 0.045 * c1
+    sh = 1.0 + 0.015 * c1
+    return np.sqrt(deltaL * deltaL + (deltaC / sc) ** 2 + deltaH / (sh * sh))
+
+
+# CIEDE2000 (kL = kC = kH = 1) between two Lab colors
+def deltaE2000(labA, labB):
+    L1, a1, b1 = labA
+    L2, a2, b2 = labB
+    cbar = ((a1 * a1 + b1 * b1) ** 0.5 + (a2 * a2 + b2 * b2) ** 0.5) / 2
+    g = 1.5 - 0.5 * (cbar**7 / (cbar**7 + 25.0**7)) ** 0.5
+    a1, a2 = a1 * g, a2 * g
+    c1, c2 = (a1 * a1 + b1 * b1) ** 0.5, (a2 * a2 + b2 * b2) ** 0.5
+    h1 = math.degrees(math.atan2(b1, a1)) % 360
+    h2 = math.degrees(math.atan2(b2, a2)) % 360
+    if c1 * c2 == 0:
+        dh, hbar = 0.0, h1 + h2
+    else:
+        dh = h2 - h1
+        if dh > 180:
+            dh -= 360
+        elif dh < -180:
+            dh += 360
+        hbar = (h1 + h2) / 2
+        if abs(h1 - h2) > 180:
+            hbar += 180 if hbar < 180 else -180
+    deltaH = 2 * (c1 * c2) ** 0.5 * math.sin(math.radians(dh) / 2)
+    t = (
+        1
+        - 0.17 * math.cos(math.radians(hbar - 30))
+        + 0.24 * math.cos(math.radians(2 * hbar))
+        + 0.32 * math.cos(math.radians(3 * hbar + 6))
+        - 0.20 * math.cos(math.radians(4 * hbar - 63))
+    )
+    lbar = ((L1 + L2) / 2 - 50) ** 2
+    sl = 1 + 0.015 * lbar / (20 + lbar) ** 0.5
+    cbar = (c1 + c2) / 2
+    sc = 1 + 0.045 * cbar
+    sh = 1 + 0.015 * cbar * t
+    rt = (
+        -math.sin(math.radians(60 * math.exp(-(((hbar - 275) / 25) ** 2))))
+        * 2
+        * (cbar**7 / (cbar**7 + 25.0**7)) ** 0.5
+    )
+    deltaL = (L2 - L1) / sl
+    deltaC = (c2 - c1) / sc
+    deltaH /= sh
+    i = deltaL * deltaL + deltaC * deltaC + deltaH * deltaH + rt * deltaC * deltaH
+    return 0 if (i < 0) else (i) ** 0.5
+
+
+def deltaE2000Array(labA, labB):
+    # CIEDE2000 between every row of labA (n, 3) and every row of labB (m, 3)
+    return deltaE2000Pairs(labA[:, None], labB[None, :])
+
+
+def deltaE2000Pairs(labA, labB):
+    # deltaE2000 between matching Lab colors of two broadcastable (..., 3) arrays
+    L1, a1, b1 = labA[..., 0], labA[..., 1], labA[..., 2]
+    L2, a2, b2 = labB[..., 0], labB[..., 1], labB[..., 2]
+    cbar = (np.sqrt(a1 * a1 + b1 * b1) + np.sqrt(a2 * a2 + b2 * b2)) / 2
+    cbar7 = cbar**7
+    g = 1.5 - 0.5 * np.sqrt(cbar7 / (cbar7 + 25.0**7))
+    a1, a2 = a1 * g, a2 * g
+    c1, c2 = np.sqrt(a1 * a1 + b1 * b1), np.sqrt(a2 * a2 + b2 * b2)
+    h1 = np.degrees(np.arctan2(b1, a1)) % 360
+    h2 = np.degrees(np.arctan2(b2, a2)) % 360
+    product = c1 * c2
+    dh = h2 - h1
+    dh = np.where(dh > 180, dh - 360, np.where(dh < -180, dh + 360, dh))
+    dh = np.where(product == 0, 0, dh)
+    deltaH = 2 * np.sqrt(product) * np.sin(np.radians(dh) / 2)
+    hbar = (h1 + h2) / 2
+    hbar = np.where(
+        np.abs(h1 - h2) > 180, np.where(hbar < 180, hbar + 180, hbar - 180), hbar
+    )
+    hbar = np.where(product == 0, h1 + h2, hbar)
+    t = (
+        1
+        - 0.17 * np.cos(np.radians(hbar - 30))
+        + 0.24 * np.cos(np.radians(2 * hbar))
+        + 0.32 * np.cos(np.radians(3 * hbar + 6))
+        - 0.20 * np.cos(np.radians(4 * hbar - 63))
+    )
+    lbar = ((L1 + L2) / 2 - 50) ** 2
+    sl = 1 + 0.015 * lbar / np.sqrt(20 + lbar)
+    cbar = (c1 + c2) / 2
+    cbar7 = cbar**7
+    sc = 1 + 0.045 * cbar
+    sh = 1 + 0.015 * cbar * t
+    rt = (
+        -np.sin(np.radians(60 * np.exp(-(((hbar - 275) / 25) ** 2))))
+        * 2
+        * np.sqrt(cbar7 / (cbar7 + 25.0**7))
+    )
+    deltaL = (L2 - L1) / sl
+    deltaC = (c2 - c1) / sc
+    deltaH = deltaH / sh
+    return np.sqrt(
+        np.maximum(
+            deltaL * deltaL + deltaC * deltaC + deltaH * deltaH + rt * deltaC * deltaH,
+            0,
+        )
+    )
+
+
+# CIEDE2000 is pruned with lower bounds of its square before the full
+# formula runs. With RT at most 2 sin(60) RC the cross term costs at most
+# that share of the chroma and hue terms, C'/SC and H'/SH only get smaller
+# with SC >= SH, and a'/b' distances are never below a/b distances:
+#   deltaE2000^2 >= (dL / SL)^2 + kappa ((G da)^2 + db^2) / SC^2
+# taking the pair's largest possible C' for SC and RC. The loose form falls
+# out of plain Lab distances: the largest SL, kappa at its smallest
+# (1 - sin(60)) and G = 1.5 for SC.
+SIN_60 = 3**0.5 / 2
+SL_MAX = 1 + 0.015 * 2500 / 2520**0.5
+
+
+def deltaE2000Bound(labA, labB):
+    # squared lower bound of deltaE2000 for broadcastable (..., 3) Lab arrays
+    deltaL = labA[..., 0] - labB[..., 0]
+    lbar = ((labA[..., 0] + labB[..., 0]) / 2 - 50) ** 2
+    sl = 1 + 0.015 * lbar / np.sqrt(20 + lbar)
+    cbar = (
+        np.sqrt(labA[..., 1] ** 2 + labA[..., 2] ** 2)
+        + np.sqrt(labB[..., 1] ** 2 + labB[..., 2] ** 2)
+    ) / 2
+    cbar7 = cbar**7
+    g = 1.5 - 0.5 * np.sqrt(cbar7 / (cbar7 + 25.0**7))
+    cmax = g * cbar
+    cmax7 = cmax**7
+    kappa = 1 - SIN_60 * np.sqrt(cmax7 / (cmax7 + 25.0**7))
+    deltaA = (labA[..., 1] - labB[..., 1]) * g
+    deltaB = labA[..., 2] - labB[..., 2]
+    sc = 1 + 0.045 * cmax
+    return (deltaL / sl) ** 2 + kappa * (deltaA * deltaA + deltaB * deltaB) / (sc * sc)
+
+
+# index of the closest catalog entry by CIEDE2000 for every row of lab. The
+# CIE76 closest entry bounds the best distance of a row, entries whose loose
+# bound (from the CIE76 distances) or pair bound is above it are dropped and
+# only the rest get the full formula.
+def matchDeltaE2000(lab, catalog_lab):
+    catalog_lab = np.asarray(catalog_lab, dtype=np.float64)
+    distances = squaredDistances(lab, catalog_lab)
+    best = (
+        deltaE2000Pairs(lab, catalog_lab[distances.argmin(axis=1)]) ** 2 * (1 + 1e-9)
+        + 1e-6
+    )
+    deltaL = lab[:, None, 0] - catalog_lab[None, :, 0]
+    deltaL *= deltaL
+    distances -= deltaL
+    chroma = np.sqrt(catalog_lab[:, 1] ** 2 + catalog_lab[:, 2] ** 2)
+    sc = 1 + 0.03375 * (np.sqrt(lab[:, 1] ** 2 + lab[:, 2] ** 2)[:, None] + chroma)
+    distances *= (1 - SIN_60) / (sc * sc)
+    distances += deltaL / (SL_MAX * SL_MAX)
+    rows, columns = np.nonzero(distances <= best[:, None])
+    keep = deltaE2000Bound(lab[rows], catalog_lab[columns]) <= best[rows]
+    rows, columns = rows[keep], columns[keep]
+    # lowest distance, then lowest index, first in every row
+    order = np.lexsort(
+        (columns, deltaE2000Pairs(lab[rows], catalog_lab[columns]), rows)
+    )
+    rows, columns = rows[order], columns[order]
+    first = np.ones(len(rows), dtype=bool)
+    first[1:] = rows[1:] != rows[:-1]
+    return columns[first]
+
+
+def colorDistances(colors, catalog_rgb, match_method, catalog_points=None):
+    # (n, m) distance matrix between colors and catalog colors for a match
+    # method, catalog_points are the catalogPoints of the catalog colors
+    if match_method in LAB_METHODS:
+        if catalog_points is None:
+            catalog_points = rgb2labArray(catalog_rgb)
+        return labDistances(rgb2labArray(colors), catalog_points, match_method)
+    if match_method == 4:
+        if catalog_points is None:
+            catalog_points = rgb2oklabArray(catalog_rgb)
+        return squaredDistances(rgb2oklabArray(colors), catalog_points)
+    colors = np.asarray(colors, dtype=np.float64)
+    if match_method == 0:  # Perceptive
+        colors = colors * PERCEPTIVE_WEIGHTS
+        catalog_rgb = catalog_rgb * PERCEPTIVE_WEIGHTS
+    return squaredDistances(colors, catalog_rgb)
+
+
+def squaredDistances(a, b):
+    # |a - b|^2 = |a|^2 + |b|^2 - 2ab, one matrix product instead of (n, m, 3) temporaries
+    distances = np.dot(a, b.T)
+    distances *= -2
+    distances += (a * a).sum(axis=1)[:, None]
+    distances += (b * b).sum(axis=1)[None, :]
+    return np.maximum(distances, 0, out=distances)
+
+
+# columns of the k smallest distances of every row of a (n, m) array, closest
+# first and lower index first on a tie like ThreadIndex.nearestK. Partial
+# selection, only the entries tied with the k-th are ranked by index.
+def smallestK(distances, k):
+    columns = np.arange(distances.shape[1])
+    if k < distances.shape[1]:
+        kth = np.partition(distances, k - 1, axis=1)[:, k - 1 : k]
+        rank = np.where(
+            distances < kth, -1, np.where(distances == kth, columns, len(columns))
+        )
+        best = np.argpartition(rank, k - 1, axis=1)[:, :k]
+    else:
+        best = np.tile(columns, (len(distances), 1))
+    order = np.lexsort((best, np.take_along_axis(distances, best, axis=1)), axis=1)
+    return np.take_along_axis(best, order, axis=1)
+
+
+# (n, m) distances between Lab colors for a Lab match method
+def labDistances(labA, labB, match_method):
+    if match_method == 3:
+        return deltaE2000Array(labA, labB)
+    return deltaEArray(labA, labB)
+
+
+def labDistance(labA, labB, match_method):
+    if match_method == 3:
+        return deltaE2000(labA, labB)
+    return deltaE(labA, labB)
+
+
+# working space coordinates of an (R, G, B) color for a match method
+def matchPoint(rgb, match_method):
+    if match_method in LAB_METHODS:
+        return rgb2lab(rgb)
+    if match_method == 4:
+        return rgb2oklab(rgb)
+    if match_method == 0:
+        return [c * w for c, w in zip(rgb, PERCEPTIVE_WEIGHTS)]
+    return list(rgb)
+
+
+def matchPointArray(rgb, match_method):
+    if match_method in LAB_METHODS:
+        return rgb2labArray(rgb)
+    if match_method == 4:
+        return rgb2oklabArray(rgb)
+    if match_method == 0:
+        return np.asarray(rgb, dtype=np.float64) * PERCEPTIVE_WEIGHTS
+    return np.asarray(rgb, dtype=np.float64)
+
+
+# k-d tree over the catalog colors for nearest thread lookups in roughly
+# logarithmic time. Points live in the working space of the match method:
+# weighted RGB for Perceptive, RGB for Regular, Lab for Delta-E and
+# CIEDE2000 and OKLab for OKLab. deltaE isn't euclidean, but with labA being the searched color
+# it is never smaller than the Lab distance with a and b divided by sc
+# (sc >= sh >= 1), so the tree searches that per query scaled space and
+# re-ranks the candidates it can't rule out with the exact deltaE. CIEDE2000
+# does the same with the loose form of deltaE2000Bound.
+class ThreadIndex(object):
+    LEAF_SIZE = 8
+
+    def __init__(self, catalog, match_method):
+        self.match_method = match_method
+        self.points = [matchPoint(rgb, match_method) for rgb in catalog.colors()]
+        self.max_chroma = max(
+            [(p[1] * p[1] + p[2] * p[2]) ** 0.5 for p in self.points] + [0]
+        )
+        self.root = self._build(list(range(0, len(self.points))))
+
+    def _build(self, indices):
+        if len(indices) <= self.LEAF_SIZE:
+            return (None, indices)
+        # split on the axis with the largest spread
+        points = self.points
+        spread = []
+        for axis in range(0, 3):
+            values = [points[i][axis] for i in indices]
+            spread.append(max(values) - min(values))
+        axis = spread.index(max(spread))
+        if spread[axis] == 0:  # all the same color
+            return (None, indices)
+        indices.sort(key=lambda i: points[i][axis])
+        middle = len(indices) // 2
+        return (
+            axis,
+            points[indices[middle]][axis],
+            self._build(indices[:middle]),
+            self._build(indices[middle:]),
+        )
+
+    def _query(self, rgb, plain=False):
+        # point to search for, per axis weights of the bound and exact distance.
+        # plain measures Lab points by plain Lab distances (CIE76) instead
+        if plain and self.match_method in LAB_METHODS:
+            lab = rgb2lab(rgb)
+            return (
+                lab,
+                (1.0, 1.0, 1.0),
+                lambda p: (
+                    (lab[0] - p[0]) ** 2 + (lab[1] - p[1]) ** 2 + (lab[2] - p[2]) ** 2
+                ),
+            )
+        if self.match_method == 2:
+            lab = rgb2lab(rgb)
+            sc = 1.0 + 0.045 * (lab[1] * lab[1] + lab[2] * lab[2]) ** 0.5
+            return (
+                lab,
+                (1.0, 1.0 / sc, 1.0 / sc),
+                lambda point: deltaE(lab, point) ** 2,
+            )
+        if self.match_method == 3:
+            lab = rgb2lab(rgb)
+            sc = 1.0 + 0.03375 * (
+                (lab[1] * lab[1] + lab[2] * lab[2]) ** 0.5 + self.max_chroma
+            )
+            weight = (1 - SIN_60) ** 0.5 / sc
+            return (
+                lab,
+                (1.0 / SL_MAX, weight, weight),
+                lambda point: deltaE2000(lab, point) ** 2,
+            )
+        point = matchPoint(rgb, self.match_method)
+        return (
+            point,
+            (1.0, 1.0, 1.0),
+            lambda p: (
+                (point[0] - p[0]) ** 2 + (point[1] - p[1]) ** 2 + (point[2] - p[2]) ** 2
+            ),
+        )
+
+    # the k closest catalog entries as (index, squared distance) pairs, closest
+    # first, lower index first on a tie
+    def nearestK(self, rgb, k, plain=False):
+        point, weights, distance = self._query(rgb, plain)
+        points = self.points
+        best = []  # heap of (-squared distance, -index), worst candidate on top
+        stack = [(self.root, 0.0)]
+        while stack:
+            node, bound = stack.pop()
+            if len(best) == k and bound > -best[0][0]:
+                continue
+            if node[0] is None:
+                for i in node[1]:
+                    candidate = (-distance(points[i]), -i)
+                    if len(best) < k:
+                        heapq.heappush(best, candidate)
+                    elif candidate > best[0]:
+                        heapq.heapreplace(best, candidate)
+                continue
+            axis, split, left, right = node
+            gap = (point[axis] - split) * weights[axis]
+            plane = max(bound, gap * gap)
+            # visit the near side first (pushed last)
+            if gap < 0:
+                stack.append((right, plane))
+                stack.append((left, bound))
+            else:
+                stack.append((left, plane))
+                stack.append((right, bound))
+        return [(-i, -d) for d, i in sorted(best, reverse=True)]
+
+    # index of the closest catalog entry
+    def nearest(self, rgb):
+        return self.nearestK(rgb, 1)[0][0]
+
+
+# index of the closest catalog entry for every color, colors is a list of
+# (R, G, B). A single gather when the catalog has a lookup table.
+def matchColors(colors, catalog, match_method):
+    if len(colors) == 0:
+        return []
+    table = catalog.lookup.get(match_method)
+    if table is not None:
+        if np is not None:
+            rgb = np.asarray(colors, dtype=np.intp).reshape(-1, 3)
+            return table[(rgb[:, 0] << 16) | (rgb[:, 1] << 8) | rgb[:, 2]].tolist()
+        return [table[(r << 16) | (g << 8) | b] for r, g, b in colors]
+    if np is not None:
+        catalog_rgb = catalog.rgbArray().astype(np.float64)
+        catalog_points = catalogPoints(catalog, match_method)
+        step = max(1, MATCH_CHUNK // len(catalog))
+        matched = []
+        for start in range(0, len(colors), step):
+            if match_method == 3:
+                lab = rgb2labArray(np.asarray(colors[start : start + step]))
+                matched.extend(matchDeltaE2000(lab, catalog_points).tolist())
+                continue
+            distances = colorDistances(
+                colors[start : start + step], catalog_rgb, match_method, catalog_points
+            )
+            matched.extend(int(i) for i in distances.argmin(axis=1))
+        return matched
+    # pure Python fallback, search a k-d tree instead of scanning the catalog
+    index = ThreadIndex(catalog, match_method)
+    return [index.nearest(rgb) for rgb in colors]
+
+
+# the k best catalog entries for every color as lists of (index, distance),
+# closest first. Distances are euclidean for Perceptive, Regular and OKLab
+# and deltaE for Delta-E and CIEDE2000. Uses partial selection, the catalog is never
+# fully sorted.
+def matchColorsTopK(colors, catalog, match_method, k):
+    k = min(k, len(catalog))
+    if len(colors) == 0 or k <= 0:
+        return [[] for rgb in colors]
+    if np is not None:
+        catalog_rgb = catalog.rgbArray().astype(np.float64)
+        catalog_points = catalogPoints(catalog, match_method)
+        step = max(1, MATCH_CHUNK // len(catalog))
+        ranked = []
+        for start in range(0, len(colors), step):
+            distances = colorDistances(
+                colors[start : start + step], catalog_rgb, match_method, catalog_points
+            )
+            best = smallestK(distances, k)
+            best_distances = np.take_along_axis(distances, best, axis=1)
+            if match_method not in LAB_METHODS:
+                best_distances = np.sqrt(best_distances)
+            for row, row_distances in zip(best.tolist(), best_distances.tolist()):
+                ranked.append(list(zip(row, row_distances)))
+        return ranked
+    index = ThreadIndex(catalog, match_method)
+    return [[(i, d**0.5) for i, d in index.nearestK(rgb, k)] for rgb in colors]
+
+
+# substitution report: the k closest threads for every color as
+# (code, name, distance), e.g. to pick a replacement for an out of stock thread.
+def getAlternatives(colors, catalog, match_method, k=5):
+    return [
+        [(catalog.code(i), catalog.name(i), d) for i, d in ranked]
+        for ranked in matchColorsTopK(colors, catalog, match_method, k)
+    ]
+
+
+MASTER_DMC = [
+    ["1", "White Tin", (239, 238, 240), 0],
+    ["2", "Tin", (197, 196, 201), 0],
+    ["3", "Medium Tin", (176, 176, 181), 0],
+    ["4", "Dark Tin", (156, 155, 157), 0],
+    ["5", "Light Driftwood", (227, 204, 190), 0],
+    ["6", "Medium Light Driftwood", (220, 198, 184), 0],
+    ["7", "Driftwood", (204, 184, 170), 0],
+    ["8", "Dark Driftwood", (157, 125, 113), 0],
+    ["9", "Very Dark Cocoa", (85, 32, 20), 0],
+    ["10", "Very Light Tender Green", (237, 254, 217), 0],
+    ["11", "Light Tender Green", (226, 237, 181), 0],
+    ["12", "Tender Green", (205, 217, 154), 0],
+    ["13", "Medium Light Nile Green", (191, 246, 224), 0],
+    ["14", "Pale Apple Green", (208, 251, 178), 0],
+    ["15", "Apple Green", (209, 237, 164), 0],
+    ["16", "Light Chartreuse", (164, 214, 124), 0],
+    ["17", "Light Yellow Plum", (229, 226, 114), 0],
+    ["18", "Yellow Plum", (217, 213, 109), 0],
+    ["19", "Medium Light Autumn Gold", (247, 201, 95), 0],
+    ["20", "Shrimp", (247, 175, 147), 0],
+    ["21", "Light Alizarian", (215, 153, 130), 0],
+    ["22", "Alizarian", (188, 96, 78), 0],
+    ["23", "Apple Blossom", (237, 226, 237), 0],
+    ["24", "White Lavender", (224, 215, 238), 0],
+    ["25", "Ultra Light Lavender", (218, 210, 233), 0],
+    ["26", "Pale Lavender", (207, 200, 222), 0],
+    ["27", "White Violet", (233, 236, 252), 0],
+    ["28", "Medium Light Eggplant", (125, 78, 146), 0],
+    ["29", "Eggplant", (103, 64, 118), 0],
+    ["30", "Medium Light Blueberry", (109, 84, 211), 0],
+    ["31", "Blueberry", (88, 52, 163), 0],
+    ["32", "Dark Blueberry", (77, 46, 138), 0],
+    ["33", "Fuchsia", (217, 83, 159), 0],
+    ["34", "Dark Fuchsia", (174, 66, 128), 0],
+    ["35", "Very Dark Fuchsia", (115, 43, 85), 0],
+    ["Ecru", "Ecru/off-white", (255, 247, 231), 0],
+    ["315", "Antique Mauve - MED DK", (125, 66, 70), 0],
+    ["Blanc", "White", (238, 238, 238), 0],
+    ["316", "Antique Mauve - MED", (188, 117, 127), 0],
+    ["B5200", "Snow White", (252, 252, 255), 0],
+    ["317", "Pewter Gray", (109, 100, 105), 0],
+    ["White", "White", (255, 255, 255), 0],
+    ["318", "Steel Gray - LT", (153, 155, 157), 0],
+    ["150", "Red - BRIGHT", (207, 0, 83), 0],
+    ["319", "Pistachio Green - VY DK", (58, 85, 59), 0],
+    ["151", "Pink", (255, 203, 215), 0],
+    ["320", "Pistachio Green - MED", (96, 140, 89), 0],
+    ["152", "Tawny - DK", (225, 161, 161), 0],
+    ["321", "Red", (189, 17, 54), 0],
+    ["153", "Lilac", (234, 197, 235), 0],
+    ["322", "Baby Blue", (58, 96, 157), 0],
+    ["154", "Red - VY DK", (75, 35, 58), 0],
+    ["326", "Rose - VY DK", (172, 28, 55), 0],
+    ["155", "Forget-me-not Blue", (151, 116, 182), 0],
+    ["327", "Violet", (94, 15, 119), 0],
+    ["156", "Blue - MED", (133, 119, 180), 0],
+    ["333", "Blue Violet - VY DK", (110, 46, 155), 0],
+    ["157", "Blue - LT", (181, 184, 234), 0],
+    ["334", "Baby Blue - MED", (96, 133, 184), 0],
+    ["158", "Blue - DK", (57, 48, 104), 0],
+    ["335", "Rose", (214, 61, 87), 0],
+    ["159", "Petrol Blue - LT", (188, 181, 222), 0],
+    ["336", "Blue", (12, 39, 94), 0],
+    ["160", "Petrol Blue - MED", (129, 120, 169), 0],
+    ["340", "Blue Violet - MED", (153, 109, 195), 0],
+    ["161", "Petrol Blue - DK", (96, 86, 139), 0],
+    ["341", "Blue Violet - LT", (163, 154, 215), 0],
+    ["162", "Baby Blue - LT", (202, 231, 240), 0],
+    ["347", "Salmon - VY DK", (171, 27, 51), 0],
+    ["163", "Green", (85, 122, 96), 0],
+    ["349", "Coral - DK", (198, 44, 56), 0],
+    ["164", "Green - LT", (186, 228, 182), 0],
+    ["350", "Coral - MED", (222, 63, 64), 0],
+    ["165", "Green - BRIGHT", (225, 244, 119), 0],
+    ["351", "Coral", (237, 98, 91), 0],
+    ["166", "Lime Green", (173, 194, 56), 0],
+    ["352", "Coral - LT", (247, 131, 114), 0],
+    ["167", "Khaki Brown", (133, 93, 49), 0],
+    ["353", "Peach", (253, 180, 161), 0],
+    ["168", "Silver Gray", (177, 174, 183), 0],
+    ["355", "Terra Cotta - DK", (151, 56, 43), 0],
+    ["169", "Pewter Gray", (130, 125, 125), 0],
+    ["356", "Terra Cotta - MED", (190, 92, 75), 0],
+    ["208", "Lavender - VY DK", (148, 66, 167), 0],
+    ["367", "Pistachio Green - DK", (68, 107, 69), 0],
+    ["209", "Lavender - DK", (186, 114, 198), 0],
+    ["368", "Pistachio Green - LT", (127, 198, 109), 0],
+    ["210", "Lavender - MED", (212, 159, 225), 0],
+    ["369", "Pistachio Green - VY LT", (205, 239, 166), 0],
+    ["211", "Lavender - LT", (229, 189, 237), 0],
+    ["370", "Mustard - MED", (145, 114, 69), 0],
+    ["221", "Shell Pink - VY DK", (121, 38, 49), 0],
+    ["371", "Mustard", (159, 131, 82), 0],
+    ["223", "Shell Pink - LT", (187, 104, 100), 0],
+    ["372", "Mustard - LT", (173, 149, 100), 0],
+    ["224", "Shell Pink - VY LT", (226, 165, 152), 0],
+    ["400", "Mahogany - DK", (129, 55, 24), 0],
+    ["225", "Shell Pink - ULT VY LT", (248, 217, 205), 0],
+    ["402", "Mahogany - VY LT", (239, 158, 116), 0],
+    ["300", "Mahogany - VY DK", (108, 49, 22), 0],
+    ["407", "Desert Sand - DK", (183, 113, 89), 0],
+    ["301", "Mahogany - MED", (170, 82, 55), 0],
+    ["413", "Pewter Gray - DK", (74, 71, 73), 0],
+    ["304", "Red - MED", (161, 12, 57), 0],
+    ["414", "Steel Gray - DK", (118, 110, 114), 0],
+    ["307", "Lemon", (253, 233, 73), 0],
+    ["415", "Pearl Gray", (184, 185, 189), 0],
+    ["309", "Rose - DK", (186, 32, 68), 0],
+    ["420", "Hazelnut Brown - DK", (133, 90, 48), 0],
+    ["310", "Black", (0, 0, 0), 0],
+    ["422", "Hazelnut Brown - LT", (201, 154, 103), 0],
+    ["311", "Blue - MED", (0, 42, 100), 0],
+    ["433", "Brown - MED", (115, 66, 30), 0],
+    ["312", "Baby Blue - VY DK", (31, 50, 121), 0],
+    ["434", "Brown - LT", (143, 83, 50), 0],
+    ["435", "Brown - VY LT", (169, 101, 56), 0],
+    ["600", "Cranberry - VY DK", (191, 28, 72), 0],
+    ["436", "Tan", (199, 133, 89), 0],
+    ["601", "Cranberry - DK", (198, 42, 83), 0],
+    ["437", "Tan - LT", (218, 162, 111), 0],
+    ["602", "Cranberry - MED", (214, 63, 104), 0],
+    ["444", "Lemon - DK", (245, 188, 19), 0],
+    ["603", "Cranberry", (237, 93, 132), 0],
+    ["445", "Lemon - LT", (252, 249, 153), 0],
+    ["604", "Cranberry - LT", (247, 147, 178), 0],
+    ["451", "Shell Gray - DK", (136, 119, 115), 0],
+    ["605", "Cranberry - VY LT", (251, 172, 196), 0],
+    ["452", "Shell Gray - MED", (173, 153, 148), 0],
+    ["606", "Orange-red - BRIGHT", (247, 15, 0), 0],
+    ["453", "Shell Gray - LT", (204, 184, 170), 0],
+    ["608", "Orange - BRIGHT", (253, 72, 12), 0],
+    ["469", "Avocado Green", (91, 101, 51), 0],
+    ["610", "Drab Brown - DK", (107, 80, 57), 0],
+    ["470", "Avocado Green - LT", (114, 129, 62), 0],
+    ["611", "Drab Brown", (124, 95, 70), 0],
+    ["471", "Avocado Green - VY LT", (158, 179, 87), 0],
+    ["612", "Drab Brown - LT", (166, 136, 94), 0],
+    ["472", "Avocado Green - ULT LT", (209, 222, 117), 0],
+    ["613", "Drab Brown - VY LT", (185, 159, 114), 0],
+    ["498", "Red - DK", (151, 11, 44), 0],
+    ["632", "Desert Sand - ULT VY DK", (127, 66, 50), 0],
+    ["500", "Blue Green - VY DK", (29, 54, 42), 0],
+    ["640", "Beige Gray - VY DK", (129, 120, 104), 0],
+    ["501", "Blue Green - DK", (47, 84, 70), 0],
+    ["642", "Beige Gray - DK", (149, 141, 121), 0],
+    ["502", "Blue Green", (87, 130, 110), 0],
+    ["644", "Beige Gray - MED", (196, 190, 166), 0],
+    ["503", "Blue Green - MED", (137, 184, 159), 0],
+    ["645", "Beaver Gray - VY DK", (93, 93, 84), 0],
+    ["504", "Blue Green - VY LT", (172, 218, 193), 0],
+    ["646", "Beaver Gray - DK", (107, 104, 96), 0],
+    ["505", "Grass Green - DK", (206, 221, 193), 0],
+    ["647", "Beaver Gray - MED", (144, 142, 133), 0],
+    ["517", "Wedgewood - DK", (33, 98, 133), 0],
+    ["648", "Beaver Gray - LT", (167, 166, 159), 0],
+    ["518", "Wedgewood - LT", (80, 129, 156), 0],
+    ["666", "Red - BRIGHT", (206, 27, 51), 0],
+    ["519", "Sky Blue", (148, 183, 203), 0],
+    ["676", "Old Gold - LT", (236, 191, 125), 0],
+    ["520", "Fern Green - DK", (56, 69, 38), 0],
+    ["677", "Old Gold - VY LT", (242, 220, 159), 0],
+    ["522", "Fern Green", (128, 139, 110), 0],
+    ["680", "Old Gold - DK", (176, 123, 70), 0],
+    ["523", "Fern Green - LT", (149, 159, 122), 0],
+    ["699", "Green", (7, 91, 38), 0],
+    ["524", "Fern Green - VY LT", (174, 167, 142), 0],
+    ["700", "Green - BRIGHT", (7, 108, 52), 0],
+    ["535", "Ash Gray - VY LT", (75, 75, 73), 0],
+    ["701", "Green - LT", (33, 124, 54), 0],
+    ["543", "Beige Brown - ULT VY LT", (234, 208, 181), 0],
+    ["702", "Kelly Green", (55, 145, 48), 0],
+    ["550", "Violet - VY DK", (88, 14, 92), 0],
+    ["703", "Chartreuse", (99, 179, 48), 0],
+    ["552", "Violet - MED", (144, 47, 153), 0],
+    ["704", "Chartreuse - BRIGHT", (136, 197, 58), 0],
+    ["553", "Violet", (164, 73, 172), 0],
+    ["712", "Cream", (246, 239, 218), 0],
+    ["554", "Violet - LT", (220, 156, 222), 0],
+    ["718", "Plum", (203, 32, 137), 0],
+    ["561", "Jade - VY DK", (40, 94, 72), 0],
+    ["720", "Orange Spice - DK", (200, 58, 36), 0],
+    ["562", "Jade - MED", (59, 140, 90), 0],
+    ["721", "Orange Spice - MED", (244, 100, 64), 0],
+    ["563", "Jade - LT", (110, 211, 154), 0],
+    ["722", "Orange Spice - LT", (249, 135, 86), 0],
+    ["564", "Jade - VY LT", (149, 228, 175), 0],
+    ["725", "Topaz", (249, 193, 91), 0],
+    ["580", "Moss Green - DK", (53, 95, 11), 0],
+    ["726", "Topaz - LT", (253, 219, 99), 0],
+    ["581", "Moss Green", (131, 138, 41), 0],
+    ["727", "Topaz - VY LT", (253, 233, 139), 0],
+    ["597", "Turquoise", (82, 173, 171), 0],
+    ["728", "Golden Yellow", (242, 174, 63), 0],
+    ["598", "Turquoise - LT", (151, 216, 211), 0],
+    ["729", "Old Gold - MED", (206, 150, 87), 0],
+    ["730", "Olive Green - VY DK", (99, 82, 11), 0],
+    ["803", "Blue - DEEP", (32, 39, 84), 0],
+    ["731", "Olive Green - DK", (107, 88, 11), 0],
+    ["806", "Peacock Blue - DK", (29, 108, 135), 0],
+    ["732", "Olive Green", (114, 92, 12), 0],
+    ["807", "Peacock Blue", (85, 139, 158), 0],
+    ["733", "Olive Green - MED", (167, 138, 68), 0],
+    ["809", "Delft Blue", (145, 159, 213), 0],
+    ["734", "Olive Green - LT", (187, 156, 84), 0],
+    ["813", "Blue - LT", (127, 160, 198), 0],
+    ["738", "Tan - VY LT", (226, 183, 131), 0],
+    ["814", "Garnet - DK", (113, 16, 51), 0],
+    ["739", "Tan - ULT VY LT", (242, 222, 185), 0],
+    ["815", "Garnet - MED", (128, 11, 52), 0],
+    ["740", "Tangerine", (253, 111, 26), 0],
+    ["816", "Garnet", (146, 18, 56), 0],
+    ["741", "Tangerine - MED", (252, 139, 16), 0],
+    ["817", "Coral Red - VY DK", (187, 22, 48), 0],
+    ["742", "Tangerine - LT", (253, 174, 60), 0],
+    ["818", "Baby Pink", (254, 222, 221), 0],
+    ["743", "Yellow - MED", (253, 215, 105), 0],
+    ["819", "Baby Pink - LT", (252, 235, 222), 0],
+    ["744", "Yellow - PALE", (254, 232, 141), 0],
+    ["820", "Royal Blue - VY DK", (21, 18, 100), 0],
+    ["745", "Yellow - LT PALE", (254, 235, 165), 0],
+    ["822", "Beige Gray - LT", (232, 223, 199), 0],
+    ["746", "Off White", (250, 242, 213), 0],
+    ["823", "Blue - DK", (0, 11, 68), 0],
+    ["747", "Sky Blue - VY LT", (206, 233, 234), 0],
+    ["824", "Blue - VY DK", (40, 71, 121), 0],
+    ["754", "Peach - LT", (247, 201, 176), 0],
+    ["825", "Blue - DK", (52, 88, 143), 0],
+    ["758", "Terra Cotta - VY LT", (233, 159, 131), 0],
+    ["826", "Blue - MED", (80, 117, 167), 0],
+    ["760", "Salmon", (236, 136, 128), 0],
+    ["827", "Blue - VY LT", (164, 193, 222), 0],
+    ["761", "Salmon - LT", (248, 180, 173), 0],
+    ["828", "Blue - ULT VY LT", (195, 215, 230), 0],
+    ["762", "Pearl Gray - VY LT", (209, 208, 210), 0],
+    ["829", "Golden Olive - VY DK", (100, 72, 12), 0],
+    ["772", "Yellow Green - VY LT", (215, 239, 167), 0],
+    ["830", "Golden Olive - DK", (110, 80, 29), 0],
+    ["775", "Baby Blue - VY LT", (212, 227, 239), 0],
+    ["831", "Golden Olive - MED", (124, 95, 32), 0],
+    ["776", "Pink - MED", (252, 168, 173), 0],
+    ["832", "Golden Olive", (156, 114, 48), 0],
+    ["777", "Red - DEEP", (155, 0, 66), 0],
+    ["833", "Golden Olive - LT", (185, 153, 86), 0],
+    ["778", "Antique Mauve - VY LT", (220, 166, 164), 0],
+    ["834", "Golden Olive - VY LT", (210, 180, 104), 0],
+    ["779", "Brown", (83, 51, 45), 0],
+    ["838", "Beige Brown - VY DK", (74, 48, 33), 0],
+    ["780", "Topaz - ULT VY DK", (148, 80, 38), 0],
+    ["839", "Beige Brown - DK", (90, 60, 45), 0],
+    ["781", "Topaz - VY DK", (162, 95, 31), 0],
+    ["840", "Beige Brown - MED", (122, 89, 57), 0],
+    ["782", "Topaz - DK", (178, 105, 35), 0],
+    ["841", "Beige Brown - LT", (163, 125, 100), 0],
+    ["783", "Topaz - MED", (208, 136, 61), 0],
+    ["842", "Beige Brown - VY LT", (203, 176, 148), 0],
+    ["791", "Cornflower Blue - VY DK", (45, 32, 104), 0],
+    ["844", "Beaver Gray - ULT DK", (73, 72, 66), 0],
+    ["792", "Cornflower Blue - DK", (69, 75, 139), 0],
+    ["868", "Hazel Nut Brown", (153, 92, 48), 0],
+    ["793", "Cornflower Blue - MED", (124, 130, 181), 0],
+    ["869", "Hazelnut Brown - VY DK", (120, 76, 40), 0],
+    ["794", "Cornflower Blue - LT", (160, 178, 215), 0],
+    ["890", "Pistachio Green - ULT DK", (50, 66, 51), 0],
+    ["796", "Royal Blue - DK", (39, 34, 118), 0],
+    ["891", "Carnation - DK", (238, 50, 70), 0],
+    ["797", "Royal Blue", (43, 50, 136), 0],
+    ["892", "Carnation - MED", (244, 71, 83), 0],
+    ["798", "Delft Blue - DK", (78, 92, 167), 0],
+    ["893", "Carnation - LT", (246, 104, 121), 0],
+    ["799", "Delft Blue - MED", (107, 127, 192), 0],
+    ["894", "Carnation - VY LT", (253, 149, 163), 0],
+    ["800", "Delft Blue - PALE", (181, 199, 233), 0],
+    ["895", "Hunter Green - VY DK", (52, 75, 46), 0],
+    ["801", "Coffee Brown - DK", (96, 57, 29), 0],
+    ["898", "Coffee Brown - VY DK", (83, 47, 27), 0],
+    ["899", "Rose - MED", (234, 107, 120), 0],
+    ["955", "Nile Green - LT", (168, 235, 173), 0],
+    ["900", "Burnt Orange - DK", (198, 49, 23), 0],
+    ["956", "Geranium", (247, 86, 109), 0],
+    ["902", "Garnet - VY DK", (101, 19, 41), 0],
+    ["957", "Geranium - PALE", (253, 153, 175), 0],
+    ["904", "Parrot Green - VY DK", (56, 99, 36), 0],
+    ["958", "Seagreen - DK", (13, 178, 148), 0],
+    ["905", "Parrot Green - DK", (70, 121, 36), 0],
+    ["959", "Seagreen - MED", (114, 208, 183), 0],
+    ["906", "Parrot Green - MED", (108, 158, 41), 0],
+    ["961", "Dusty Rose - DK", (222, 88, 108), 0],
+    ["907", "Parrot Green - LT", (157, 199, 45), 0],
+    ["962", "Dusty Rose - MED", (235, 113, 131), 0],
+    ["909", "Emerald Green - VY DK", (16, 107, 67), 0],
+    ["963", "Dusty Rose - ULT VY LT", (253, 204, 209), 0],
+    ["910", "Emerald Green - DK", (16, 129, 78), 0],
+    ["964", "Seagreen - LT", (165, 228, 212), 0],
+    ["911", "Emerald Green - MED", (16, 146, 86), 0],
+    ["966", "Baby Green - MED", (148, 210, 138), 0],
+    ["912", "Emerald Green - LT", (54, 178, 107), 0],
+    ["967", "Peach - LT", (255, 194, 172), 0],
+    ["913", "Nile Green - MED", (85, 202, 125), 0],
+    ["970", "Pumpkin - LT", (251, 103, 33), 0],
+    ["915", "Plum - DK", (149, 8, 90), 0],
+    ["971", "Pumpkin", (252, 103, 13), 0],
+    ["917", "Plum - MED", (172, 16, 113), 0],
+    ["972", "Canary - DEEP", (251, 159, 17), 0],
+    ["918", "Red Copper - DK", (136, 54, 48), 0],
+    ["973", "Canary - BRIGHT", (252, 205, 45), 0],
+    ["919", "Red Copper", (155, 55, 27), 0],
+    ["975", "Golden Brown - DK", (129, 60, 17), 0],
+    ["920", "Copper - MED", (171, 72, 54), 0],
+    ["976", "Golden Brown - MED", (207, 117, 50), 0],
+    ["921", "Copper", (192, 87, 61), 0],
+    ["977", "Golden Brown - LT", (236, 143, 67), 0],
+    ["922", "Copper - LT", (221, 110, 76), 0],
+    ["986", "Forest Green - VY DK", (46, 82, 48), 0],
+    ["924", "Gray Green - VY DK", (56, 74, 74), 0],
+    ["987", "Forest Green - DK", (67, 104, 56), 0],
+    ["926", "Gray Green - MED", (97, 118, 116), 0],
+    ["988", "Forest Green - MED", (102, 146, 74), 0],
+    ["927", "Gray Green - LT", (159, 168, 165), 0],
+    ["989", "Forest Green", (113, 167, 78), 0],
+    ["928", "Gray Green - VY LT", (192, 198, 192), 0],
+    ["991", "Aquamarine - DK", (19, 95, 85), 0],
+    ["930", "Antique Blue - DK", (73, 92, 107), 0],
+    ["992", "Aquamarine - LT", (66, 181, 158), 0],
+    ["931", "Antique Blue - MED", (102, 118, 132), 0],
+    ["993", "Aquamarine - VY LT", (98, 216, 182), 0],
+    ["932", "Antique Blue - LT", (147, 160, 175), 0],
+    ["995", "Electric Blue - DK", (0, 97, 176), 0],
+    ["934", "Avocado Green - BLACK", (50, 51, 36), 0],
+    ["996", "Electric Blue - MED", (73, 168, 235), 0],
+    ["935", "Avocado Green - DK", (56, 58, 42), 0],
+    ["3011", "Khaki Green - DK", (101, 89, 53), 0],
+    ["936", "Avocado Green - VY DK", (63, 66, 39), 0],
+    ["3012", "Khaki Green - MED", (139, 123, 78), 0],
+    ["937", "Avocado Green - MED", (67, 79, 44), 0],
+    ["3013", "Khaki Green - LT", (175, 169, 123), 0],
+    ["938", "Coffee Brown - ULT DK", (69, 39, 26), 0],
+    ["3021", "Brown Gray - VY DK", (80, 64, 59), 0],
+    ["939", "Blue - VY DK", (9, 9, 47), 0],
+    ["3022", "Brown Gray - MED", (132, 130, 116), 0],
+    ["943", "Aquamarine - MED", (0, 154, 119), 0],
+    ["3023", "Brown Gray - LT", (162, 155, 134), 0],
+    ["945", "Tawny", (246, 193, 154), 0],
+    ["3024", "Brown Gray - VY LT", (190, 184, 172), 0],
+    ["946", "Burnt Orange - MED", (237, 65, 21), 0],
+    ["3031", "Mocha Brown - VY DK", (66, 48, 20), 0],
+    ["947", "Burnt Orange", (252, 79, 22), 0],
+    ["3032", "Mocha Brown - MED", (157, 136, 104), 0],
+    ["948", "Peach - VY LT", (253, 230, 211), 0],
+    ["3033", "Mocha Brown - VY LT", (219, 199, 173), 0],
+    ["950", "Desert Sand - LT", (229, 172, 141), 0],
+    ["3041", "Antique Violet - MED", (134, 106, 118), 0],
+    ["951", "Tawny - LT", (250, 221, 182), 0],
+    ["3042", "Antique Violet - LT", (175, 152, 160), 0],
+    ["954", "Nile Green", (111, 218, 138), 0],
+    ["3045", "Yellow Beige - DK", (175, 129, 82), 0],
+    ["3046", "Yellow Beige - MED", (206, 176, 116), 0],
+    ["3731", "Dusty Rose - VY DK", (195, 76, 92), 0],
+    ["3047", "Yellow Beige - LT", (234, 216, 171), 0],
+    ["3733", "Dusty Rose", (234, 126, 134), 0],
+    ["3051", "Green Gray - DK", (76, 76, 30), 0],
+    ["3740", "Antique Violet - DK", (113, 83, 93), 0],
+    ["3052", "Green Gray - MED", (120, 126, 92), 0],
+    ["3743", "Antique Violet - VY LT", (207, 194, 201), 0],
+    ["3053", "Green Gray", (153, 157, 117), 0],
+    ["3746", "Blue Violet - DK", (132, 74, 181), 0],
+    ["3064", "Desert Sand", (186, 112, 86), 0],
+    ["3747", "Blue Violet - VY LT", (208, 197, 236), 0],
+    ["3072", "Beaver Gray - VY LT", (210, 210, 202), 0],
+    ["3750", "Antique Blue - VY DK", (29, 69, 82), 0],
+    ["3078", "Golden Yellow - VY LT", (252, 246, 182), 0],
+    ["3752", "Antique Blue - VY LT", (186, 201, 204), 0],
+    ["3325", "Baby Blue - LT", (173, 205, 231), 0],
+    ["3753", "Antique Blue - ULT VY LT", (217, 230, 236), 0],
+    ["3326", "Rose - LT", (249, 151, 156), 0],
+    ["3755", "Baby Blue (?)", (129, 165, 216), 0],
+    ["3328", "Salmon - DK", (190, 68, 74), 0],
+    ["3756", "Baby Blue", (233, 244, 250), 0],
+    ["3340", "Apricot - MED", (253, 107, 79), 0],
+    ["3760", "Wedgewood - MED", (70, 114, 147), 0],
+    ["3341", "Apricot", (253, 142, 120), 0],
+    ["3761", "Sky Blue - LT", (177, 208, 223), 0],
+    ["3345", "Hunter Green - DK", (64, 85, 46), 0],
+    ["3765", "Peacock Blue - VY DK", (23, 94, 120), 0],
+    ["3346", "Hunter Green", (86, 116, 59), 0],
+    ["3766", "Peacock Blue - LT", (75, 138, 161), 0],
+    ["3347", "Yellow Green - MED", (109, 150, 70), 0],
+    ["3768", "Gray Green - DK", (76, 96, 95), 0],
+    ["3348", "Yellow Green - LT", (190, 223, 116), 0],
+    ["3770", "Tawny - VY LT", (254, 241, 216), 0],
+    ["3350", "Dusty Rose - ULT DK", (170, 57, 73), 0],
+    ["3771", "Peach - DK", (232, 172, 155), 0],
+    ["3354", "Dusty Rose - LT", (239, 165, 172), 0],
+    ["3772", "Desert Sand - VY DK", (153, 87, 68), 0],
+    ["3362", "Pine Green - DK", (73, 82, 60), 0],
+    ["3773", "Desert Sand - MED", (207, 134, 109), 0],
+    ["3363", "Pine Green - MED", (97, 116, 81), 0],
+    ["3774", "Desert Sand - VY LT", (243, 207, 180), 0],
+    ["3364", "Pine Green", (142, 155, 109), 0],
+    ["3776", "Mahogany - LT", (201, 100, 68), 0],
+    ["3371", "Black Brown", (54, 34, 14), 0],
+    ["3777", "Terra Cotta - VY DK", (146, 47, 37), 0],
+    ["3607", "Plum - LT", (217, 76, 157), 0],
+    ["3778", "Terra Cotta - LT", (210, 112, 92), 0],
+    ["3608", "Plum - VY LT", (236, 129, 190), 0],
+    ["3779", "Terra Cotta - ULT VY LT", (242, 171, 149), 0],
+    ["3609", "Plum - ULT LT", (246, 176, 223), 0],
+    ["3781", "Mocha Brown - DK", (89, 63, 43), 0],
+    ["3685", "Mauve - VY DK", (121, 38, 59), 0],
+    ["3782", "Mocha Brown - LT", (182, 157, 128), 0],
+    ["3687", "Mauve", (181, 69, 93), 0],
+    ["3787", "Brown Gray - DK", (98, 82, 76), 0],
+    ["3688", "Mauve - MED", (220, 124, 134), 0],
+    ["3790", "Beige Gray - ULT DK", (109, 90, 75), 0],
+    ["3689", "Mauve - LT", (248, 187, 200), 0],
+    ["3799", "Pewter Gray - VY DK", (57, 57, 61), 0],
+    ["3705", "Melon - DK", (242, 73, 79), 0],
+    ["3801", "Melon - VY DK", (228, 53, 61), 0],
+    ["3706", "Melon - MED", (253, 110, 112), 0],
+    ["3802", "Antique Mauve - VY DK", (103, 42, 51), 0],
+    ["3708", "Melon - LT", (253, 160, 174), 0],
+    ["3803", "Mauve - DK", (135, 42, 67), 0],
+    ["3712", "Salmon - MED", (217, 93, 93), 0],
+    ["3804", "Cyclamen Pink - DK", (206, 43, 99), 0],
+    ["3713", "Salmon - VY LT", (253, 213, 208), 0],
+    ["3805", "Cyclamen Pink", (223, 60, 115), 0],
+    ["3716", "Dusty Rose - VY LT", (252, 175, 185), 0],
+    ["3806", "Cyclamen Pink - LT", (241, 90, 145), 0],
+    ["3721", "Shell Pink - DK", (147, 59, 61), 0],
+    ["3807", "Cornflower Blue", (75, 89, 158), 0],
+    ["3722", "Shell Pink - MED", (160, 75, 76), 0],
+    ["3808", "Turquoise - ULT VY DK", (3, 83, 92), 0],
+    ["3726", "Antique Mauve - DK", (149, 86, 92), 0],
+    ["3809", "Turquoise - VY DK", (19, 106, 117), 0],
+    ["3727", "Antique Mauve - LT", (218, 158, 166), 0],
+    ["3810", "Turquoise - DK", (45, 141, 152), 0],
+    ["3811", "Turquoise - VY LT", (168, 226, 229), 0],
+    ["3839", "Lavender Blue - MED", (122, 126, 197), 0],
+    ["3812", "Seagreen - VY DK", (7, 161, 132), 0],
+    ["3840", "Lavender Blue - LT", (178, 189, 234), 0],
+    ["3813", "Blue Green - LT", (134, 195, 171), 0],
+    ["3841", "Baby Blue - PALE", (217, 234, 242), 0],
+    ["3814", "Aquamarine", (11, 134, 115), 0],
+    ["3842", "Wedgewood - DK", (6, 80, 106), 0],
+    ["3815", "Celadon Green - DK", (67, 114, 89), 0],
+    ["3843", "Electric Blue", (40, 163, 222), 0],
+    ["3816", "Celadon Green", (96, 147, 122), 0],
+    ["3844", "Bright Turquoise - DK", (31, 127, 160), 0],
+    ["3817", "Celadon Green - LT", (129, 198, 164), 0],
+    ["3845", "Bright Turquoise - MED", (43, 173, 209), 0],
+    ["3818", "Emerald Green - ULT VY DK", (0, 93, 46), 0],
+    ["3846", "Bright Turquoise - LT", (94, 204, 236), 0],
+    ["3819", "Moss Green - LT", (204, 201, 89), 0],
+    ["3847", "Teal Green - DK", (24, 99, 88), 0],
+    ["3820", "Straw - DK", (219, 165, 62), 0],
+    ["3848", "Teal Green - MED", (32, 126, 114), 0],
+    ["3821", "Straw", (235, 187, 82), 0],
+    ["3849", "Teal Green - LT", (53, 177, 147), 0],
+    ["3822", "Straw - LT", (247, 209, 105), 0],
+    ["3850", "Bright Green - DK", (32, 139, 70), 0],
+    ["3823", "Yellow - ULT PALE", (254, 245, 205), 0],
+    ["3851", "Bright Green - LT", (97, 187, 132), 0],
+    ["3824", "Apricot - LT", (252, 174, 153), 0],
+    ["3852", "Straw - VY DK", (227, 167, 48), 0],
+    ["3825", "Pumpkin - PALE", (254, 163, 112), 0],
+    ["3853", "Autumn Gold - DK", (239, 129, 37), 0],
+    ["3826", "Golden Brown", (177, 102, 51), 0],
+    ["3854", "Autumn Gold - MED", (251, 172, 86), 0],
+    ["3827", "Golden Brown - PALE", (234, 166, 100), 0],
+    ["3855", "Autumn Gold - LT", (253, 223, 160), 0],
+    ["3828", "Hazelnut Brown", (170, 124, 67), 0],
+    ["3856", "Mahogany - ULT VY LT", (253, 190, 142), 0],
+    ["3829", "Old Gold - VY DK", (167, 103, 29), 0],
+    ["3857", "Rosewood - DK", (106, 47, 38), 0],
+    ["3830", "Terra Cotta", (169, 65, 56), 0],
+    ["3858", "Rosewood - MED", (128, 58, 50), 0],
+    ["3831", "Raspberry - DK", (193, 43, 82), 0],
+    ["3859", "Rosewood - LT", (186, 122, 108), 0],
+    ["3832", "Raspberry - MED", (227, 99, 112), 0],
+    ["3860", "Cocoa", (137, 99, 98), 0],
+    ["3833", "Raspberry - LT", (234, 139, 150), 0],
+    ["3861", "Cocoa - LT", (172, 133, 131), 0],
+    ["3834", "Grape - DK", (106, 34, 88), 0],
+    ["3862", "Mocha Beige - DK", (110, 73, 42), 0],
+    ["3835", "Grape - MED", (146, 77, 120), 0],
+    ["3863", "Mocha Beige - MED", (148, 114, 93), 0],
+    ["3836", "Grape - LT", (197, 151, 185), 0],
+    ["3864", "Mocha Beige - LT", (201, 170, 146), 0],
+    ["3837", "Lavender - ULT DK", (138, 42, 143), 0],
+    ["3865", "Winter White", (255, 253, 249), 0],
+    ["3838", "Lavender Blue - DK", (96, 107, 173), 0],
+    ["3866", "Mocha Brown - ULT VY LT", (240, 230, 215), 0],
+    ["3880", "Medium Very Dark Shell Pink", (121, 60, 55), 0],
+    ["3881", "Pale Avocado Green", (143, 164, 99), 0],
+    ["3882", "Medium Light Cocoa", (103, 71, 50), 0],
+    ["3883", "Medium Light Copper", (221, 111, 50), 0],
+    ["3884", "Medium Light Pewter", (103, 110, 107), 0],
+    ["3885", "Medium Very Dark Blue", (5, 66, 129), 0],
+    ["3886", "Very Dark Plum", (108, 13, 83), 0],
+    ["3887", "Ultra Very Dark Lavender", (99, 56, 136), 0],
+    ["3888", "Medium Dark Antique Violet", (107, 91, 102), 0],
+    ["3889", "Medium Light Lemon", (241, 220, 76), 0],
+    ["3890", "Very Light Bright Turquoise", (56, 203, 238), 0],
+    ["3891", "Very Dark Bright Turquoise", (5, 95, 157), 0],
+    ["3892", "Medium Light Orange Spice", (246, 98, 9), 0],
+    ["3893", "Very Light Mocha Beige", (203, 173, 151), 0],
+    ["3894", "Very Light Parrot Green", (144, 172, 9), 0],
+    ["3895", "Medium Dark Beaver Gray", (135, 132, 113), 0],
+]
+
+
+# thread catalog kept as flat arrays instead of a list per entry:
+#   rgb      uint8 R, G, B per entry
+#   threads  int16 MASTER_DMC index of the first and second thread per entry
+#            (second is -1 for a pure DMC color)
+#   strands  uint8 strands of the first thread (0 for a pure DMC color)
+# codes and names are only looked up in MASTER_DMC when asked for. The arrays
+# are numpy arrays (memory-mapped when loaded from the cache) or array.array
+# without numpy. No two entries share the same RGB.
+class Catalog(object):
+    def __init__(self, rgb, threads, strands, total_strands, lab=None):
+        self.rgb = rgb
+        self.threads = threads
+        self.strands = strands
+        self.total_strands = total_strands
+        self.lab = lab
+        self.oklab = None
+        # lookup tables by match method (see useLookupTable)
+        self.lookup = {}
+        self._colors = None
+        self._index = None
+
+    def __len__(self):
+        return len(self.strands)
+
+    def color(self, i):
+        return (
+            int(self.rgb[i * 3]),
+            int(self.rgb[i * 3 + 1]),
+            int(self.rgb[i * 3 + 2]),
+        )
+
+    # all colors as (R, G, B) tuples
+    def colors(self):
+        if self._colors is None:
+            if np is not None:
+                self._colors = [tuple(rgb) for rgb in self.rgbArray().tolist()]
+            else:
+                self._colors = [self.color(i) for i in range(0, len(self))]
+        return self._colors
+
+    # catalog index of an (R, G, B) color or None, a hash lookup (colors are
+    # unique in a catalog)
+    def indexOf(self, rgb):
+        if self._index is None:
+            self._index = dict((rgb, i) for i, rgb in enumerate(self.colors()))
+        return self._index.get(tuple(rgb))
+
+    # (n, 3) uint8 view of the colors
+    def rgbArray(self):
+        return np.frombuffer(self.rgb, dtype=np.uint8).reshape(-1, 3)
+
+    # R, G, B bytes of the given entries, one after the other
+    def rgbBytes(self, indices):
+        if np is not None:
+            return self.rgbArray()[np.asarray(indices, dtype=np.intp)].tobytes()
+        rgb = array("B")
+        for i in indices:
+            rgb.extend(self.rgb[i * 3 : i * 3 + 3])
+        return rgb.tostring() if sys.version_info[0] < 3 else rgb.tobytes()
+
+    def threadIndices(self, i):
+        return int(self.threads[i * 2]), int(self.threads[i * 2 + 1])
+
+    def firstStrands(self, i):
+        return int(self.strands[i])
+
+    def code(self, i):
+        return ", ".join(MASTER_DMC[t][0] for t in self.threadIndices(i) if t >= 0)
+
+    def name(self, i):
+        return ", ".join(MASTER_DMC[t][1] for t in self.threadIndices(i) if t >= 0)
+
+    # the entry as [code, name, rgb, 0] for a pure DMC color and
+    # [codes, names, rgb, 0, first thread rgb, second thread rgb, strands of
+    # the first thread] for a blend, the form the thread info drawing uses.
+    def entry(self, i):
+        first, second = self.threadIndices(i)
+        if second < 0:
+            return MASTER_DMC[first]
+        return [
+            self.code(i),
+            self.name(i),
+            self.color(i),
+            0,
+            MASTER_DMC[first][2],
+            MASTER_DMC[second][2],
+            self.firstStrands(i),
+        ]
+
+
+# catalog out of numpy rows, keeping the first entry of every RGB
+def makeCatalog(rgb, threads, strands, total_strands):
+    packed = (rgb[:, 0].astype(np.int32) << 16) | (rgb[:, 1] << 8) | rgb[:, 2]
+    keep = np.sort(np.unique(packed, return_index=True)[1])
+    return Catalog(
+        np.ascontiguousarray(rgb[keep], dtype=np.uint8).ravel(),
+        np.ascontiguousarray(threads[keep], dtype=np.int16).ravel(),
+        np.ascontiguousarray(strands[keep], dtype=np.uint8),
+        total_strands,
+    )
+
+
+# the pure DMC colors as a catalog
+def getMasterCatalog():
+    if np is not None:
+        return makeCatalog(
+            np.array([thread[2] for thread in MASTER_DMC], dtype=np.int32),
+            np.array([(i, -1) for i in range(0, len(MASTER_DMC))]),
+            np.zeros(len(MASTER_DMC)),
+            1,
+        )
+    rgb, threads, strands = array("B"), array("h"), array("B")
+    seen = set()
+    for i in range(0, len(MASTER_DMC)):
+        if MASTER_DMC[i][2] not in seen:
+            seen.add(MASTER_DMC[i][2])
+            rgb.extend(MASTER_DMC[i][2])
+            threads.extend([i, -1])
+            strands.append(0)
+    return Catalog(rgb, threads, strands, 1)
+
+
+# create all possible blends, of threads at most allow_diff_range apart in
+# every RGB channel or, when allow_diff_lab is set, at most allow_diff_lab
+# apart in Lab (CIE76) instead
+allow_diff_range = 50
+allow_diff_lab = None
+
+
+# pairs i < j of (n, 3) points at most radius apart, in their largest
+# coordinate difference with box and euclidean otherwise, ordered by i then
+# j. Points are bucketed into a grid of radius sized cells, so only points
+# of neighbouring cells get compared and the cost follows the number of
+# close pairs rather than n^2.
+def neighborPairs(points, radius, box=True):
+    size = float(radius) if radius > 0 else 1.0
+    if np is not None:
+        points = np.asarray(points, dtype=np.float64)
+        cells = np.floor(points / size).astype(np.int64)
+        # cells start at 1 and the span leaves room for the neighbours around
+        cells -= cells.min(axis=0) - 1
+        span = cells.max(axis=0) + 2
+        keys = (cells[:, 0] * span[1] + cells[:, 1]) * span[2] + cells[:, 2]
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        first, second = [], []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for dz in (-1, 0, 1):
+                    target = keys + (dx * span[1] + dy) * span[2] + dz
+                    start = np.searchsorted(sorted_keys, target, "left")
+                    counts = np.searchsorted(sorted_keys, target, "right") - start
+                    i = np.repeat(np.arange(len(points)), counts)
+                    j = order[
+                        np.repeat(start - np.cumsum(counts) + counts, counts)
+                        + np.arange(len(i))
+                    ]
+                    keep = i < j
+                    first.append(i[keep])
+                    second.append(j[keep])
+        first, second = np.concatenate(first), np.concatenate(second)
+        difference = np.abs(points[first] - points[second])
+        if box:
+            close = difference.max(axis=1) <= radius
+        else:
+            close = (difference * difference).sum(axis=1) <= radius * radius
+        first, second = first[close], second[close]
+        order = np.lexsort((second, first))
+        return first[order], second[order]
+    buckets = {}
+    cells = []
+    for i in range(0, len(points)):
+        cell = tuple(int(math.floor(c / size)) for c in points[i])
+        buckets.setdefault(cell, []).append(i)
+        cells.append(cell)
+    pairs = []
+    for i in range(0, len(points)):
+        x, y, z = cells[i]
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                for dz in (-1, 0, 1):
+                    for j in buckets.get((x + dx, y + dy, z + dz), ()):
+                        if j <= i:
+                            continue
+                        difference = [abs(a - b) for a, b in zip(points[i], points[j])]
+                        if box:
+                            close = max(difference) <= radius
+                        else:
+                            close = sum(d * d for d in difference) <= radius * radius
+                        if close:
+                            pairs.append((i, j))
+    pairs.sort()
+    return [i for i, j in pairs], [j for i, j in pairs]
+
+
+# the MASTER_DMC thread pairs close enough to be blended
+def blendPairs():
+    colors = [thread[2] for thread in MASTER_DMC]
+    if allow_diff_lab is None:
+        return neighborPairs(colors, allow_diff_range)
+    if np is not None:
+        lab = rgb2labArray(np.array(colors, dtype=np.int32))
+    else:
+        lab = [rgb2lab(rgb) for rgb in colors]
+    return neighborPairs(lab, allow_diff_lab, box=False)
+
+
+# the pure DMC colors followed by all blends of two close threads with the
+# given total number of strands. Every pair gets one blend per strand split
+# (1+5, 5+1, 2+4, ... for 6 strands), the first thread of a blend being the
+# one with fewer (or equal) strands.
+def getStrandBlends(strands):
+    message("Total colors:" + str(len(MASTER_DMC)))
+    if np is not None:
+        rgb = np.array([thread[2] for thread in MASTER_DMC], dtype=np.int32)
+        # only allow to use as blend if colors are somewhat close together.
+        first, second = blendPairs()
+        # one column per strand split, rows are pairs
+        split_rgb, split_threads, split_strands = [], [], []
+        for a in range(1, strands // 2 + 1):
+            b = strands - a
+            for x, y in (
+                [(first, second)] if a == b else [(first, second), (second, first)]
+            ):
+                # rounded (a * x + b * y) / strands in integers
+                split_rgb.append(
+                    (2 * (a * rgb[x] + b * rgb[y]) + strands) // (2 * strands)
+                )
+                split_threads.append(np.stack([x, y], axis=1))
+                split_strands.append(np.full(len(x), a))
+        catalog = makeCatalog(
+            np.concatenate([rgb, np.stack(split_rgb, axis=1).reshape(-1, 3)]),
+            np.concatenate(
+                [
+                    np.stack([np.arange(len(rgb)), np.full(len(rgb), -1)], axis=1),
+                    np.stack(split_threads, axis=1).reshape(-1, 2),
+                ]
+            ),
+            np.concatenate(
+                [np.zeros(len(rgb)), np.stack(split_strands, axis=1).ravel()]
+            ),
+            strands,
+        )
+    else:
+        rgb, threads, first_strands = array("B"), array("h"), array("B")
+        seen = set()
+
+        def add(color, x, y, a):
+            if color not in seen:
+                seen.add(color)
+                rgb.extend(color)
+                threads.extend([x, y])
+                first_strands.append(a)
+
+        for x in range(0, len(MASTER_DMC)):
+            add(MASTER_DMC[x][2], x, -1, 0)
+        # only allow to use as blend if colors are somewhat close together.
+        for x, y in zip(*blendPairs()):
+            for a in range(1, strands // 2 + 1):
+                b = strands - a
+                for x1, y1 in [(x, y)] if a == b else [(x, y), (y, x)]:
+                    add(
+                        tuple(
+                            (2 * (a * c1 + b * c2) + strands) // (2 * strands)
+                            for c1, c2 in zip(MASTER_DMC[x1][2], MASTER_DMC[y1][2])
+                        ),
+                        x1,
+                        y1,
+                        a,
+                    )
+        catalog = Catalog(rgb, threads, first_strands, strands)
+    message("Total colors after creating blends:" + str(len(catalog)))
+
+    return catalog
+
+
+# blend catalogs are cached on disk as they take a while to generate on every
+# run. Files are keyed by a hash of the catalog, allow_diff_range (or
+# allow_diff_lab) and blend mode and hold the catalog arrays in
+# little-endian order:
+#   header  magic, format version, number of entries, total strands
+#   int16   first and second thread per entry
+#   uint8   strands of the first thread per entry
+#   uint8   R, G, B per entry
+#   float32 L, a, b per entry
+# without any padding, so the Lab block isn't 4-byte aligned (numpy maps it
+# all the same).
+CACHE_DIR = os.environ.get(
+    "CROSS_STITCH_CACHE", os.path.join(os.path.expanduser("~"), ".cross_stitch_tt")
+)
+CACHE_MAGIC = b"CSTT"
+CACHE_VERSION = 3
+CACHE_HEADER = struct.Struct("<4sHII")
+
+
+def catalogCachePath(allow_blend):
+    key = hashlib.sha1()
+    key.update(
+        repr(
+            (
+                CACHE_VERSION,
+                allow_blend,
+                allow_diff_range if allow_diff_lab is None else ("lab", allow_diff_lab),
+                [(entry[0], entry[1], tuple(entry[2])) for entry in MASTER_DMC],
+            )
+        ).encode("utf-8")
+    )
+    return os.path.join(CACHE_DIR, "blends-" + key.hexdigest() + ".bin")
+
+
+def writeCacheArray(cache_file, data, dtype, typecode):
+    if np is not None:
+        np.asarray(data, dtype=dtype).tofile(cache_file)
+        return
+    data = array(typecode, data)
+    if sys.byteorder == "big":
+        data.byteswap()
+    data.tofile(cache_file)
+
+
+# cache file at path written by write(file) into a temp file of this
+# process and swapped in whole, so workers building the same cache at once
+# never see (or leave behind) a half written file
+def writeCacheFile(path, write):
+    try:
+        os.makedirs(CACHE_DIR)
+    except OSError:  # another process may have just made it
+        if not os.path.isdir(CACHE_DIR):
+            raise
+    temp_path = path + ".%d.tmp" % os.getpid()
+    try:
+        with open(temp_path, "wb") as cache_file:
+            write(cache_file)
+        if hasattr(os, "replace"):
+            os.replace(temp_path, path)
+        else:  # Python 2, rename doesn't replace files on windows
+            if os.path.exists(path):
+                os.remove(path)
+            os.rename(temp_path, path)
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def saveCatalogCache(path, catalog):
+    count = len(catalog)
+    if np is not None:
+        lab = catalogLab(catalog)
+    else:
+        lab = []
+        for rgb in catalog.colors():
+            lab.extend(rgb2lab(rgb))
+
+    def write(cache_file):
+        cache_file.write(
+            CACHE_HEADER.pack(CACHE_MAGIC, CACHE_VERSION, count, catalog.total_strands)
+        )
+        writeCacheArray(cache_file, catalog.threads, "<i2", "h")
+        writeCacheArray(cache_file, catalog.strands, "u1", "B")
+        writeCacheArray(cache_file, catalog.rgb, "u1", "B")
+        writeCacheArray(cache_file, lab, "<f4", "f")
+
+    writeCacheFile(path, write)
+
+
+def loadCatalogCache(path):
+    with open(path, "rb") as cache_file:
+        magic, version, count, total_strands = CACHE_HEADER.unpack(
+            cache_file.read(CACHE_HEADER.size)
+        )
+        if magic != CACHE_MAGIC or version != CACHE_VERSION:
+            return None
+        offsets = [CACHE_HEADER.size]
+        for size in (count * 2 * 2, count, count * 3):
+            offsets.append(offsets[-1] + size)
+        if np is not None:
+            return Catalog(
+                np.memmap(path, "u1", "r", offsets[2], (count * 3,)),
+                np.memmap(path, "<i2", "r", offsets[0], (count * 2,)),
+                np.memmap(path, "u1", "r", offsets[1], (count,)),
+                total_strands,
+                np.memmap(path, "<f4", "r", offsets[3], (count, 3)),
+            )
+        arrays = []
+        for offset, typecode, size in (
+            (offsets[2], "B", count * 3),
+            (offsets[0], "h", count * 2),
+            (offsets[1], "B", count),
+        ):
+            cache_file.seek(offset)
+            data = array(typecode)
+            data.fromfile(cache_file, size)
+            if sys.byteorder == "big":
+                data.byteswap()
+            arrays.append(data)
+    return Catalog(arrays[0], arrays[1], arrays[2], total_strands)
+
+
+# the thread catalog for a blend mode, from the cache when it was generated
+# before. Any cache problem just falls back to generating it.
+def getCatalog(allow_blend):
+    if allow_blend < 1:
+        return getMasterCatalog()
+    path = catalogCachePath(allow_blend)
+    try:
+        if os.path.exists(path):
+            catalog = loadCatalogCache(path)
+            if catalog is not None:
+                return catalog
+    except (IOError, OSError, ValueError, EOFError, struct.error):
+        pass
+    catalog = getStrandBlends(allow_blend + 1)
+    try:
+        saveCatalogCache(path, catalog)
+    except (IOError, OSError):
+        pass
+    return catalog
+
+
+# distances between every two MASTER_DMC threads, e.g. for thread
+# substitutions. metric is a match method (its distance as
+# matchColorsTopK reports it; Delta-E isn't symmetric, the larger direction
+# counts) or BOX_METRIC, the largest difference of one RGB channel. Matrices are
+# cached next to the blend catalogs as the upper triangle in row order (row
+# i holding threads i + 1 ... n - 1), little-endian float32 after a header of
+# magic, format version, number of threads and metric.
+DISTANCES_MAGIC = b"CSTD"
+DISTANCES_VERSION = 1
+DISTANCES_HEADER = struct.Struct("<4sHIh2x")
+BOX_METRIC = -1
+
+
+def threadDistancesPath(metric):
+    key = hashlib.sha1(
+        repr(
+            (
+                DISTANCES_VERSION,
+                metric,
+                [(entry[0], entry[1], tuple(entry[2])) for entry in MASTER_DMC],
+            )
+        ).encode("utf-8")
+    )
+    return os.path.join(CACHE_DIR, "distances-" + key.hexdigest() + ".bin")
+
+
+# upper triangle of the distance matrix of the MASTER_DMC threads
+def buildThreadDistances(metric):
+    colors = [tuple(entry[2]) for entry in MASTER_DMC]
+    count = len(colors)
+    if np is not None:
+        rgb = np.array(colors, dtype=np.int32)
+        if metric == BOX_METRIC:
+            matrix = np.abs(rgb[:, None, :] - rgb[None, :, :]).max(axis=2)
+        elif metric in LAB_METHODS:
+            matrix = labDistances(rgb2labArray(rgb), rgb2labArray(rgb), metric)
+            matrix = np.maximum(matrix, matrix.T)
+        else:
+            points = matchPointArray(rgb, metric)
+            matrix = np.sqrt(
+                ((points[:, None, :] - points[None, :, :]) ** 2).sum(axis=2)
+            )
+        return matrix[np.triu_indices(count, 1)].astype(np.float32)
+    points = (
+        [matchPoint(rgb, metric) for rgb in colors] if metric != BOX_METRIC else colors
+    )
+    distances = array("f")
+    for i in range(0, count):
+        for j in range(i + 1, count):
+            if metric == BOX_METRIC:
+                distance = max(abs(a - b) for a, b in zip(colors[i], colors[j]))
+            elif metric in LAB_METHODS:
+                distance = max(
+                    labDistance(points[i], points[j], metric),
+                    labDistance(points[j], points[i], metric),
+                )
+            else:
+                distance = (
+                    sum((a - b) ** 2 for a, b in zip(points[i], points[j])) ** 0.5
+                )
+            distances.append(distance)
+    return distances
+
+
+def saveThreadDistances(path, distances, metric):
+    def write(distances_file):
+        distances_file.write(
+            DISTANCES_HEADER.pack(
+                DISTANCES_MAGIC, DISTANCES_VERSION, len(MASTER_DMC), metric
+            )
+        )
+        writeCacheArray(distances_file, distances, "<f4", "f")
+
+    writeCacheFile(path, write)
+
+
+def loadThreadDistances(path, metric):
+    count = len(MASTER_DMC) * (len(MASTER_DMC) - 1) // 2
+    with open(path, "rb") as distances_file:
+        header = DISTANCES_HEADER.unpack(distances_file.read(DISTANCES_HEADER.size))
+        if header != (DISTANCES_MAGIC, DISTANCES_VERSION, len(MASTER_DMC), metric):
+            return None
+        if np is not None:
+            return np.memmap(path, "<f4", "r", DISTANCES_HEADER.size, (count,))
+        distances = array("f")
+        distances.fromfile(distances_file, count)
+        if sys.byteorder == "big":
+            distances.byteswap()
+        return distances
+
+
+# the ThreadDistances of a metric, from the cache when it was built before
+def getThreadDistances(metric):
+    path = threadDistancesPath(metric)
+    distances = None
+    try:
+        if os.path.exists(path):
+            distances = loadThreadDistances(path, metric)
+    except (IOError, OSError, ValueError, EOFError, struct.error):
+        pass
+    if distances is None:
+        distances = buildThreadDistances(metric)
+        try:
+            saveThreadDistances(path, distances, metric)
+        except (IOError, OSError):
+            pass
+    return ThreadDistances(distances, len(MASTER_DMC))
+
+
+# queries on the upper triangle of a thread distance matrix, answered with
+# slices and gathers instead of scanning thread pairs
+class ThreadDistances(object):
+    def __init__(self, distances, count):
+        self.distances = distances
+        self.count = count
+        # position of row i, which starts with the distance of i to i + 1
+        self.starts = [i * (2 * count - i - 1) // 2 for i in range(0, count + 1)]
+
+    def distance(self, i, j):
+        if i == j:
+            return 0.0
+        if i > j:
+            i, j = j, i
+        return float(self.distances[self.starts[i] + j - i - 1])
+
+    # distances from thread i to every thread, as an array or a list
+    def row(self, i):
+        if np is not None:
+            before = np.arange(0, i)
+            return np.concatenate(
+                [
+                    np.asarray(self.distances)[
+                        np.asarray(self.starts[0:i], dtype=np.intp) + i - before - 1
+                    ],
+                    [0.0],
+                    self.distances[self.starts[i] : self.starts[i + 1]],
+                ]
+            )
+        return [self.distance(i, j) for j in range(0, self.count)]
+
+    # threads other than i at most distance away from it, by index
+    def within(self, i, distance):
+        row = self.row(i)
+        if np is not None:
+            found = np.nonzero(row <= distance)[0]
+            return [int(j) for j in found if j != i]
+        return [j for j in range(0, self.count) if j != i and row[j] <= distance]
+
+    # the k threads closest to i (i itself left out) as (index, distance),
+    # closest first, lower index first on a tie
+    def nearest(self, i, k):
+        row = self.row(i)
+        if np is not None:
+            row = np.array(row, dtype=np.float64)
+            row[i] = np.inf
+            k = min(k, self.count - 1)
+            if k <= 0:
+                return []
+            best = smallestK(row[None], k)[0]
+            return [(int(j), float(row[j])) for j in best]
+        ranked = sorted((row[j], j) for j in range(0, self.count) if j != i)
+        return [(j, d) for d, j in ranked[0:k]]
+
+    # every pair of threads i < j at most distance apart, in row order, as
+    # two arrays (lists without numpy) of first and second threads
+    def pairsWithin(self, distance):
+        if np is not None:
+            found = np.nonzero(np.asarray(self.distances) <= distance)[0]
+            first = np.searchsorted(self.starts, found, side="right") - 1
+            return first, found - np.asarray(self.starts)[first] + first + 1
+        first, second = [], []
+        for i in range(0, self.count):
+            for p in range(self.starts[i], self.starts[i + 1]):
+                if self.distances[p] <= distance:
+                    first.append(i)
+                    second.append(p - self.starts[i] + i + 1)
+        return first, second
+
+
+# the k DMC threads closest to the one with the given code as (code, name,
+# distance), e.g. to replace an out of stock thread
+def getThreadSubstitutes(code, match_method, k=5):
+    i = [entry[0] for entry in MASTER_DMC].index(str(code))
+    return [
+        (MASTER_DMC[j][0], MASTER_DMC[j][1], distance)
+        for j, distance in getThreadDistances(match_method).nearest(i, k)
+    ]
+
+
+# the closest catalog entry of every 24-bit color never changes for a
+# catalog and match method, so it can be looked up instead of matched:
+# lookup tables hold it for the whole RGB cube, 256x256x256 little-endian
+# uint16 catalog indices (32 MB) indexed by R << 16 | G << 8 | B, after a
+# header of magic, format version, number of catalog entries and match
+# method. Tables are built with numpy and cached next to the blend catalogs,
+# later runs memory-map them. Catalogs with more entries than uint16 indices
+# can tell apart get no table, they are matched as usual.
+LOOKUP_MAGIC = b"CSTL"
+LOOKUP_VERSION = 1
+LOOKUP_HEADER = struct.Struct("<4sHIH4x")
+LOOKUP_MAX_ENTRIES = 0xFFFF
+# the cube is built in blocks of LOOKUP_BLOCK^3 colors, each block matching
+# only the threads that can be closest to one of its cells of LOOKUP_CELL^3
+LOOKUP_BLOCK = 32
+LOOKUP_CELL = 8
+
+
+def lookupTablePath(allow_blend, match_method):
+    catalog_key = os.path.basename(catalogCachePath(allow_blend))
+    key = hashlib.sha1(
+        repr((LOOKUP_VERSION, catalog_key, match_method)).encode("utf-8")
+    )
+    return os.path.join(CACHE_DIR, "lookup-" + key.hexdigest() + ".bin")
+
+
+# colorDistances between working space points (see matchPointArray)
+def pointDistances(points, thread_points, match_method):
+    if match_method in LAB_METHODS:
+        return labDistances(points, thread_points, match_method)
+    return squaredDistances(points, thread_points)
+
+
+# which catalog entries (out of indices) can be closest to any color of a
+# group, for (groups, colors, 3) working space points, as a (groups,
+# len(indices)) mask. Every color of a group is at most bound away from the
+# entry closest to its middle color, so entries farther than bound from the
+# box around the group are ruled out. The box distance is a lower
+# bound the way ThreadIndex bounds distances, with a and b divided by the
+# largest sc of the group for Delta-E and scaled as in deltaE2000Bound for
+# CIEDE2000, with the largest SL, SC and RC the group allows.
+def lookupCandidates(points, indices, thread_points, match_method):
+    subset = thread_points[indices]
+    middle = points[:, points.shape[1] // 2]
+    # any entry bounds the distances, the closest in Lab is good enough
+    seeds = subset[squaredDistances(middle, subset).argmin(axis=1)]
+    if match_method == 2:
+        bound = deltaEPairs(points, seeds[:, None]).max(axis=1) ** 2
+    elif match_method == 3:
+        bound = deltaE2000Pairs(points, seeds[:, None]).max(axis=1) ** 2
+    else:
+        bound = ((points - seeds[:, None]) ** 2).sum(axis=2).max(axis=1)
+    gaps = np.maximum(
+        np.maximum(
+            points.min(axis=1)[:, None] - subset, subset - points.max(axis=1)[:, None]
+        ),
+        0,
+    )
+    gaps *= gaps
+    if match_method == 2:
+        chroma = np.sqrt(points[:, :, 1] ** 2 + points[:, :, 2] ** 2).max(axis=1)
+        sc = 1.0 + 0.045 * chroma[:, None]
+        gaps[:, :, 1:] /= (sc * sc)[:, :, None]
+    elif match_method == 3:
+        # largest C' and SL a pair of a group color and an entry can have
+        chroma = np.sqrt(points[:, :, 1] ** 2 + points[:, :, 2] ** 2).max(axis=1)
+        cmax = 0.75 * (chroma[:, None] + np.sqrt(subset[:, 1] ** 2 + subset[:, 2] ** 2))
+        cmax7 = cmax**7
+        kappa = 1 - SIN_60 * np.sqrt(cmax7 / (cmax7 + 25.0**7))
+        sc = 1.0 + 0.045 * cmax
+        lbar = (
+            np.maximum(
+                np.abs((points[:, :, 0].min(axis=1)[:, None] + subset[:, 0]) / 2 - 50),
+                np.abs((points[:, :, 0].max(axis=1)[:, None] + subset[:, 0]) / 2 - 50),
+            )
+            ** 2
+        )
+        sl = 1 + 0.015 * lbar / np.sqrt(20 + lbar)
+        gaps[:, :, 0] /= sl * sl
+        gaps[:, :, 1:] *= (kappa / (sc * sc))[:, :, None]
+    return gaps.sum(axis=2) <= (bound * (1 + 1e-9) + 1e-9)[:, None]
+
+
+# lookup table of a catalog for a match method as a flat numpy array, the
+# same answers as matchColors for every color
+def buildLookupTable(catalog, match_method):
+    if len(catalog) > LOOKUP_MAX_ENTRIES:
+        raise ValueError("too many catalog entries for a lookup table")
+    thread_points = catalogPoints(catalog, match_method)
+    if thread_points is None:
+        thread_points = matchPointArray(catalog.rgbArray(), match_method)
+    table = np.empty(1 << 24, dtype=np.uint16)
+    everything = np.arange(len(catalog))
+    cell = np.stack(
+        np.meshgrid(*[np.arange(LOOKUP_CELL)] * 3, indexing="ij"), axis=-1
+    ).reshape(-1, 3)
+    cells = np.stack(
+        np.meshgrid(*[np.arange(0, LOOKUP_BLOCK, LOOKUP_CELL)] * 3, indexing="ij"),
+        axis=-1,
+    ).reshape(-1, 1, 3)
+    block = cells + cell
+    for corner in np.stack(
+        np.meshgrid(*[np.arange(0, 256, LOOKUP_BLOCK)] * 3, indexing="ij"), axis=-1
+    ).reshape(-1, 3):
+        rgb = corner + block
+        keys = (rgb[:, :, 0] << 16) | (rgb[:, :, 1] << 8) | rgb[:, :, 2]
+        points = matchPointArray(rgb.reshape(-1, 3), match_method).reshape(rgb.shape)
+        candidates = everything[
+            lookupCandidates(
+                points.reshape(1, -1, 3), everything, thread_points, match_method
+            )[0]
+        ]
+        masks = lookupCandidates(points, candidates, thread_points, match_method)
+        for c in range(0, len(points)):
+            nearest = candidates[masks[c]]
+            if match_method == 3:
+                table[keys[c]] = nearest[
+                    matchDeltaE2000(points[c], thread_points[nearest])
+                ]
+                continue
+            distances = pointDistances(points[c], thread_points[nearest], match_method)
+            table[keys[c]] = nearest[distances.argmin(axis=1)]
+    return table
+
+
+def saveLookupTable(path, table, catalog, match_method):
+    def write(table_file):
+        table_file.write(
+            LOOKUP_HEADER.pack(LOOKUP_MAGIC, LOOKUP_VERSION, len(catalog), match_method)
+        )
+        writeCacheArray(table_file, table, "<u2", "H")
+
+    writeCacheFile(path, write)
+
+
+# the table at path, memory-mapped (read into an array.array without numpy),
+# or None when it isn't a table of this catalog and match method
+def loadLookupTable(path, catalog, match_method):
+    with open(path, "rb") as table_file:
+        magic, version, count, method = LOOKUP_HEADER.unpack(
+            table_file.read(LOOKUP_HEADER.size)
+        )
+        if (magic, version, count, method) != (
+            LOOKUP_MAGIC,
+            LOOKUP_VERSION,
+            len(catalog),
+            match_method,
+        ) or count > LOOKUP_MAX_ENTRIES:
+            return None
+        if np is not None:
+            return np.memmap(path, "<u2", "r", LOOKUP_HEADER.size, (1 << 24,))
+        table = array("H")
+        table.fromfile(table_file, 1 << 24)
+        if sys.byteorder == "big":
+            table.byteswap()
+        return table
+
+
+# attach the lookup table of the catalog of a blend mode for a match method,
+# so matchColors looks colors up in it. The table is loaded from the cache,
+# or built (needs numpy, takes a while for blend catalogs) and cached when
+# build is set. Returns the table, None when there is none (always for
+# catalogs over LOOKUP_MAX_ENTRIES entries).
+def useLookupTable(catalog, allow_blend, match_method, build=True):
+    if len(catalog) > LOOKUP_MAX_ENTRIES:
+        return None
+    path = lookupTablePath(allow_blend, match_method)
+    table = None
+    try:
+        if os.path.exists(path):
+            table = loadLookupTable(path, catalog, match_method)
+    except (IOError, OSError, ValueError, EOFError, struct.error):
+        pass
+    if table is None and build and np is not None:
+        message("Building color lookup table, only needed once")
+        table = buildLookupTable(catalog, match_method)
+        try:
+            saveLookupTable(path, table, catalog, match_method)
+        except (IOError, OSError):
+            pass
+    if table is not None:
+        catalog.lookup[match_method] = table
+    return table
+
+
+# ------------------------------------------------------------------
+# pattern pipeline on in-memory pixels
+#
+# pixels are flat row-major sequences of 8-bit values (bytes, bytearray,
+# array.array or numpy arrays) with 1 (gray), 2 (gray + alpha), 3 (RGB) or
+# 4 (RGBA) channels. Results are numpy arrays, or array.array without numpy.
+# ------------------------------------------------------------------
+
+# interpolation choices of the plug-in dialog
+INTERPOLATION_NONE = 0
+
+# cells with less alpha than this stay empty (no stitch)
+ALPHA_THRESHOLD = 128
+
+AIDA_COUNTS = (14, 16, 18)
+
+
+# flat RGBA copy of pixels with any supported number of channels
+def toRGBA(pixels, width, height, channels):
+    count = width * height
+    if np is not None:
+        source = np.frombuffer(bytearray(pixels), dtype=np.uint8).reshape(
+            count, channels
+        )
+        rgba = np.empty((count, 4), dtype=np.uint8)
+        rgba[:, 0:3] = source[:, 0:1] if channels < 3 else source[:, 0:3]
+        rgba[:, 3] = source[:, channels - 1] if channels in (2, 4) else 255
+        return rgba.ravel()
+    source = array("B", pixels)
+    rgba = array("B", [255]) * (count * 4)
+    for i in range(0, count):
+        if channels < 3:
+            rgba[i * 4] = rgba[i * 4 + 1] = rgba[i * 4 + 2] = source[i * channels]
+        else:
+            rgba[i * 4 : i * 4 + 3] = source[i * channels : i * channels + 3]
+        if channels in (2, 4):
+            rgba[i * 4 + 3] = source[i * channels + channels - 1]
+    return rgba
+
+
+# (source index, weight) pairs of every output position when averaging the
+# area each output cell covers
+def areaWeights(old_size, new_size):
+    step = float(old_size) / new_size
+    weights = []
+    for i in range(0, new_size):
+        start, end = i * step, (i + 1) * step
+        cell = []
+        for source in range(int(start), min(old_size, int(math.ceil(end)))):
+            cover = min(end, source + 1) - max(start, source)
+            if cover > 0:
+                cell.append((source, cover / step))
+        weights.append(cell)
+    return weights
+
+
+def nearestIndices(old_size, new_size):
+    return [
+        min(old_size - 1, int((i + 0.5) * old_size / new_size))
+        for i in range(0, new_size)
+    ]
+
+
+# area average of one axis of a float array, exact for any scale factor:
+# integrate the pixels (piecewise constant) between the output cell edges
+def scaleAxis(values, axis, new_size):
+    old_size = values.shape[axis]
+    edges = np.arange(new_size + 1) * (float(old_size) / new_size)
+    floor = np.minimum(edges.astype(np.intp), old_size - 1)
+    sums = np.cumsum(values, axis=axis)
+    shape = list(values.shape)
+    shape[axis] = 1
+    sums = np.concatenate([np.zeros(shape), sums], axis=axis)
+    fraction_shape = [1] * values.ndim
+    fraction_shape[axis] = new_size + 1
+    integral = np.take(sums, floor, axis=axis) + np.take(values, floor, axis=axis) * (
+        edges - floor
+    ).reshape(fraction_shape)
+    return np.diff(integral, axis=axis) / (float(old_size) / new_size)
+
+
+# scale pixels to new_width x new_height, the result is flat RGBA. "None"
+# interpolation samples the nearest pixel, every other choice averages the
+# area each new pixel covers (weighted by alpha so transparent pixels don't
+# bleed into the colors), which is what reducing an image to stitches needs.
+def scalePixels(
+    pixels, width, height, channels, new_width, new_height, interpolation=2
+):
+    rgba = toRGBA(pixels, width, height, channels)
+    if interpolation == INTERPOLATION_NONE:
+        columns = nearestIndices(width, new_width)
+        rows = nearestIndices(height, new_height)
+        if np is not None:
+            image = rgba.reshape(height, width, 4)
+            return np.ascontiguousarray(image[rows][:, columns]).ravel()
+        scaled = array("B")
+        for y in rows:
+            for x in columns:
+                scaled.extend(rgba[(y * width + x) * 4 : (y * width + x) * 4 + 4])
+        return scaled
+    if np is not None:
+        image = rgba.reshape(height, width, 4).astype(np.float64)
+        image[:, :, 0:3] *= image[:, :, 3:4]  # premultiplied alpha
+        image = scaleAxis(scaleAxis(image, 0, new_height), 1, new_width)
+        alpha = image[:, :, 3:4]
+        image[:, :, 0:3] /= np.where(alpha > 0, alpha, 1)
+        return np.clip(np.floor(image + 0.5), 0, 255).astype(np.uint8).ravel()
+    column_weights = areaWeights(width, new_width)
+    row_weights = areaWeights(height, new_height)
+    scaled = array("B")
+    for cells in row_weights:
+        # average the source rows of this output row, premultiplied alpha
+        row = [0.0] * (width * 4)
+        for y, weight in cells:
+            for x in range(0, width):
+                i = (y * width + x) * 4
+                alpha = rgba[i + 3] * weight
+                row[x * 4] += rgba[i] * alpha
+                row[x * 4 + 1] += rgba[i + 1] * alpha
+                row[x * 4 + 2] += rgba[i + 2] * alpha
+                row[x * 4 + 3] += alpha
+        for cells_x in column_weights:
+            pixel = [0.0, 0.0, 0.0, 0.0]
+            for x, weight in cells_x:
+                for c in range(0, 4):
+                    pixel[c] += row[x * 4 + c] * weight
+            alpha = pixel[3] if pixel[3] > 0 else 1
+            scaled.extend(
+                [min(255, int(math.floor(c / alpha + 0.5))) for c in pixel[0:3]]
+                + [min(255, int(math.floor(pixel[3] + 0.5)))]
+            )
+    return scaled
+
+
+# colors are quantized on a histogram: one pass bins the opaque pixels on a
+# 32x32x32 RGB grid and keeps running sums (moments) per bin, then the grid
+# is cut into at most num_colors boxes, each box becoming the mean color of
+# its pixels. Cost is linear in the pixels plus a fixed amount per color and
+# the output only depends on the input.
+#   "wu"          Xiaolin Wu's quantizer, cuts the box with the largest
+#                 squared error where the cut reduces the error most
+#   "median-cut"  splits the box with the widest range at its weighted median
+# With lab the squared errors are measured in Lab: Wu minimizes them and
+# median cut splits the box with the largest one first. Boxes still cut the
+# RGB grid.
+QUANTIZERS = ("wu", "median-cut")
+QUANTIZE_BITS = 5
+# bins per channel plus the zero border the cumulative moments need
+QUANTIZE_SIDE = (1 << QUANTIZE_BITS) + 1
+
+
+# bin of every pixel (-1 for transparent ones) and the moments of every bin
+# of the histogram: [weight, sum 1, sum 2, sum 3, sum of squares, sum R,
+# sum G, sum B] where sums 1-3 are RGB, or Lab with lab. Bins are flat
+# indices into the QUANTIZE_SIDE cube, moments numpy arrays or lists.
+def colorHistogram(rgba, lab=False):
+    side = QUANTIZE_SIDE
+    size = side * side * side
+    shift = 8 - QUANTIZE_BITS
+    count = len(rgba) // 4
+    if np is not None:
+        image = np.asarray(rgba).reshape(count, 4)
+        opaque = image[:, 3] >= ALPHA_THRESHOLD
+        rgb = image[opaque, 0:3]
+        bins = (
+            ((rgb[:, 0] >> shift).astype(np.intp) + 1) * side * side
+            + ((rgb[:, 1] >> shift).astype(np.intp) + 1) * side
+            + (rgb[:, 2] >> shift).astype(np.intp)
+            + 1
+        )
+        values = rgb2labArray(rgb) if lab else None
+        rgb = rgb.astype(np.float64)
+        if values is None:
+            values = rgb
+        moments = [np.bincount(bins, minlength=size).astype(np.float64)]
+        for c in range(0, 3):
+            moments.append(np.bincount(bins, values[:, c], minlength=size))
+        moments.append(np.bincount(bins, (values * values).sum(axis=1), size))
+        for c in range(0, 3):
+            moments.append(np.bincount(bins, rgb[:, c], minlength=size))
+        pixel_bins = np.full(count, -1, dtype=np.intp)
+        pixel_bins[opaque] = bins
+        return pixel_bins, moments
+    moments = [[0.0] * size for m in range(0, 8)]
+    pixel_bins = array("l", [-1]) * count
+    lab_cache = {}
+    for i in range(0, count):
+        if rgba[i * 4 + 3] < ALPHA_THRESHOLD:
+            continue
+        rgb = (rgba[i * 4], rgba[i * 4 + 1], rgba[i * 4 + 2])
+        b = (
+            ((rgb[0] >> shift) + 1) * side * side
+            + ((rgb[1] >> shift) + 1) * side
+            + (rgb[2] >> shift)
+            + 1
+        )
+        pixel_bins[i] = b
+        values = rgb
+        if lab:
+            if rgb not in lab_cache:
+                lab_cache[rgb] = rgb2lab(rgb)
+            values = lab_cache[rgb]
+        moments[0][b] += 1
+        for c in range(0, 3):
+            moments[1 + c][b] += values[c]
+            moments[5 + c][b] += rgb[c]
+        moments[4][b] += values[0] ** 2 + values[1] ** 2 + values[2] ** 2
+    return pixel_bins, moments
+
+
+# colorHistogram with the moments summed up from the origin of the cube, as
+# flat lists
+def colorMoments(rgba, lab=False):
+    side = QUANTIZE_SIDE
+    size = side * side * side
+    pixel_bins, moments = colorHistogram(rgba, lab)
+    if np is not None:
+        for m in range(0, len(moments)):
+            cube = moments[m].reshape(side, side, side)
+            moments[m] = cube.cumsum(0).cumsum(1).cumsum(2).ravel().tolist()
+        return pixel_bins, moments
+    # running sums along b, then g, then r
+    for stride in (1, side, side * side):
+        for m in moments:
+            for i in range(stride, size):
+                if (i // stride) % side:
+                    m[i] += m[i - stride]
+    return pixel_bins, moments
+
+
+# sum of a moment over a box (r0, r1] x (g0, g1] x (b0, b1]
+def boxSum(box, moment):
+    r0, r1, g0, g1, b0, b1 = box
+    side = QUANTIZE_SIDE
+    r0, r1 = r0 * side * side, r1 * side * side
+    g0, g1 = g0 * side, g1 * side
+    return (
+        moment[r1 + g1 + b1]
+        - moment[r1 + g1 + b0]
+        - moment[r1 + g0 + b1]
+        + moment[r1 + g0 + b0]
+        - moment[r0 + g1 + b1]
+        + moment[r0 + g1 + b0]
+        + moment[r0 + g0 + b1]
+        - moment[r0 + g0 + b0]
+    )
+
+
+# squared error of a box around its mean, 0 for boxes of one bin
+def boxError(box, moments):
+    if (box[1] - box[0]) * (box[3] - box[2]) * (box[5] - box[4]) <= 1:
+        return 0.0
+    weight = boxSum(box, moments[0])
+    if weight == 0:
+        return 0.0
+    sums = [boxSum(box, moments[c]) for c in range(1, 4)]
+    return boxSum(box, moments[4]) - sum(s * s for s in sums) / weight
+
+
+# (axis, position) of the cut of a box that leaves the smallest squared
+# error, None if the box can't be cut
+def wuCut(box, moments):
+    weight = boxSum(box, moments[0])
+    sums = [boxSum(box, moments[c]) for c in range(1, 4)]
+    best, best_cut = 0.0, None
+    for axis in range(0, 3):
+        half = list(box)
+        for position in range(box[axis * 2] + 1, box[axis * 2 + 1]):
+            half[axis * 2 + 1] = position
+            half_weight = boxSum(half, moments[0])
+            if half_weight == 0 or half_weight == weight:
+                continue
+            half_sums = [boxSum(half, moments[c]) for c in range(1, 4)]
+            score = sum(s * s for s in half_sums) / half_weight + sum(
+                (s - h) ** 2 for s, h in zip(sums, half_sums)
+            ) / (weight - half_weight)
+            if score > best:
+                best, best_cut = score, (axis, position)
+    return best_cut
+
+
+def wuBoxes(moments, num_colors):
+    side = QUANTIZE_SIDE
+    boxes = [[0, side - 1, 0, side - 1, 0, side - 1]]
+    errors = [boxError(boxes[0], moments)]
+    while len(boxes) < num_colors:
+        b = errors.index(max(errors))
+        if errors[b] <= 0:
+            break
+        cut = wuCut(boxes[b], moments)
+        if cut is None:
+            errors[b] = 0.0
+            continue
+        axis, position = cut
+        low, high = list(boxes[b]), list(boxes[b])
+        low[axis * 2 + 1] = position
+        high[axis * 2] = position
+        boxes[b] = low
+        boxes.append(high)
+        errors[b] = boxError(low, moments)
+        errors.append(boxError(high, moments))
+    return boxes
+
+
+# box shrunk to the bins that hold pixels
+def shrinkBox(box, weights):
+    box = list(box)
+    for axis in range(0, 3):
+        slab = list(box)
+        while box[axis * 2 + 1] - box[axis * 2] > 1:
+            slab[axis * 2], slab[axis * 2 + 1] = box[axis * 2], box[axis * 2] + 1
+            if boxSum(slab, weights) > 0:
+                break
+            box[axis * 2] += 1
+        while box[axis * 2 + 1] - box[axis * 2] > 1:
+            slab[axis * 2], slab[axis * 2 + 1] = (
+                box[axis * 2 + 1] - 1,
+                box[axis * 2 + 1],
+            )
+            if boxSum(slab, weights) > 0:
+                break
+            box[axis * 2 + 1] -= 1
+    return box
+
+
+# with by_error the box with the largest squared error is split instead of
+# the one with the widest range, still along its widest channel
+def medianCutBoxes(moments, num_colors, by_error=False):
+    side = QUANTIZE_SIDE
+    boxes = [shrinkBox([0, side - 1, 0, side - 1, 0, side - 1], moments[0])]
+    errors = [boxError(boxes[0], moments)] if by_error else None
+    while len(boxes) < num_colors:
+        # the box with the widest channel range, first one on ties
+        best, best_axis, best_range = None, 0, 1
+        for b in range(0, len(boxes)):
+            if by_error and b != errors.index(max(errors)):
+                continue
+            for axis in range(0, 3):
+                if boxes[b][axis * 2 + 1] - boxes[b][axis * 2] > best_range:
+                    best, best_axis = b, axis
+                    best_range = boxes[b][axis * 2 + 1] - boxes[b][axis * 2]
+        if best is None:
+            break
+        box = boxes[best]
+        half = boxSum(box, moments[0]) / 2.0
+        low = list(box)
+        for position in range(box[best_axis * 2] + 1, box[best_axis * 2 + 1]):
+            low[best_axis * 2 + 1] = position
+            if boxSum(low, moments[0]) >= half:
+                break
+        high = list(box)
+        high[best_axis * 2] = low[best_axis * 2 + 1]
+        boxes[best] = shrinkBox(low, moments[0])
+        boxes.append(shrinkBox(high, moments[0]))
+        if by_error:
+            errors[best] = boxError(boxes[best], moments)
+            errors.append(boxError(boxes[-1], moments))
+    return boxes
+
+
+# opaque pixels of a flat RGBA image reduced to at most num_colors colors
+# with one of QUANTIZERS. Returns the palette as (R, G, B) tuples and the
+# palette index of every pixel (-1 for transparent pixels).
+def quantizePixels(rgba, num_colors, method="wu", lab=False):
+    pixel_bins, moments = colorMoments(rgba, lab)
+    if method == "median-cut":
+        boxes = medianCutBoxes(moments, num_colors, lab)
+    else:
+        boxes = wuBoxes(moments, num_colors)
+    side = QUANTIZE_SIDE
+    palette = []
+    labels = [-1] * (side * side * side)
+    for box in boxes:
+        weight = boxSum(box, moments[0])
+        if weight == 0:
+            continue
+        palette.append(
+            tuple(
+                int(math.floor(boxSum(box, moments[5 + c]) / weight + 0.5))
+                for c in range(0, 3)
+            )
+        )
+        for r in range(box[0] + 1, box[1] + 1):
+            for g in range(box[2] + 1, box[3] + 1):
+                start = (r * side + g) * side
+                labels[start + box[4] + 1 : start + box[5] + 1] = [len(palette) - 1] * (
+                    box[5] - box[4]
+                )
+    if np is not None:
+        labels = np.array(labels + [-1], dtype=np.int16)
+        return palette, labels[pixel_bins]
+    return palette, array("h", [labels[b] if b >= 0 else -1 for b in pixel_bins])
+
+
+# threads picked straight from the catalog instead of quantizing first and
+# matching after, so no two colors collapse onto one thread. Works on the
+# color histogram: every thread added greedily is the one that lowers the
+# pixel weighted squared match error most (facility location), then each
+# thread moves to the best candidate for the colors it serves until nothing
+# changes (k-medoids). Candidates are the KMEDOIDS_NEIGHBORS closest threads
+# of each histogram color, at most KMEDOIDS_CANDIDATES of the most used, and
+# all errors come from one table computed up front.
+KMEDOIDS_NEIGHBORS = 4
+KMEDOIDS_CANDIDATES = 512
+KMEDOIDS_ROUNDS = 10
+
+
+# histogram colors with their pixel counts, candidate threads and the
+# (colors, candidates) table of squared match errors
+def kmedoidsTable(bin_colors, bin_weights, catalog, match_method):
+    if np is not None and match_method in LAB_METHODS:
+        # deltaE against the whole catalog is slow and the neighbours are only
+        # candidates, so they come from plain Lab distances (CIE76), without
+        # numpy too so both give the same threads
+        lab = rgb2labArray(bin_colors)
+        catalog_lab = np.asarray(catalogLab(catalog), dtype=np.float64)
+        k = min(KMEDOIDS_NEIGHBORS, len(catalog))
+        step = max(1, MATCH_CHUNK // len(catalog))
+        near = []
+        for start in range(0, len(lab), step):
+            distances = colorDistances(lab[start : start + step], catalog_lab, 1)
+            near.extend(smallestK(distances, k).tolist())
+    elif np is not None:
+        near = [
+            [i for i, distance in row]
+            for row in matchColorsTopK(
+                bin_colors, catalog, match_method, KMEDOIDS_NEIGHBORS
+            )
+        ]
+    else:
+        index = ThreadIndex(catalog, match_method)
+        near = [
+            [
+                i
+                for i, distance in index.nearestK(
+                    rgb, KMEDOIDS_NEIGHBORS, match_method in LAB_METHODS
+                )
+            ]
+            for rgb in bin_colors
+        ]
+    use = {}
+    for b in range(0, len(near)):
+        for i in near[b]:
+            use[i] = use.get(i, 0) + bin_weights[b]
+    candidates = sorted(use, key=lambda i: (-use[i], i))[:KMEDOIDS_CANDIDATES]
+    candidates.sort()
+    if np is not None:
+        candidate_rgb = catalog.rgbArray()[candidates].astype(np.float64)
+        candidate_points = catalogPoints(catalog, match_method)
+        if candidate_points is not None:
+            candidate_points = np.asarray(candidate_points)[candidates]
+        table = colorDistances(
+            bin_colors, candidate_rgb, match_method, candidate_points
+        )
+        if match_method in LAB_METHODS:  # deltaE isn't squared yet
+            table *= table
+        return candidates, table
+    points = [index.points[i] for i in candidates]
+    table = []
+    for rgb in bin_colors:
+        distance = index._query(rgb)[2]
+        table.append([distance(point) for point in points])
+    return candidates, table
+
+
+# columns of the table picked greedily, then refined, as candidate positions
+def kmedoidsColumns(table, weights, num_colors):
+    if np is not None:
+        weights = np.asarray(weights, dtype=np.float64)
+        chosen = [int(np.argmin(np.dot(weights, table)))]
+        current = table[:, chosen[0]].copy()
+        while len(chosen) < min(num_colors, table.shape[1]):
+            gains = np.dot(weights, np.maximum(current[:, None] - table, 0))
+            best = int(np.argmax(gains))
+            if gains[best] <= 0:
+                break
+            chosen.append(best)
+            np.minimum(current, table[:, best], out=current)
+        for step in range(0, KMEDOIDS_ROUNDS):
+            assigned = np.argmin(table[:, chosen], axis=1)
+            moved = False
+            for j in range(0, len(chosen)):
+                members = assigned == j
+                costs = np.dot(weights[members], table[members])
+                costs[[c for c in chosen if c != chosen[j]]] = np.inf
+                best = int(np.argmin(costs))
+                if costs[best] < costs[chosen[j]]:
+                    chosen[j] = best
+                    moved = True
+            if not moved:
+                break
+        return chosen, np.argmin(table[:, chosen], axis=1).tolist()
+    columns = range(0, len(table[0]))
+    chosen = [
+        min(columns, key=lambda c: sum(w * row[c] for w, row in zip(weights, table)))
+    ]
+    current = [row[chosen[0]] for row in table]
+    while len(chosen) < min(num_colors, len(table[0])):
+        gains = [
+            sum(w * max(e - row[c], 0) for w, e, row in zip(weights, current, table))
+            for c in columns
+        ]
+        best = gains.index(max(gains))
+        if gains[best] <= 0:
+            break
+        chosen.append(best)
+        current = [min(e, row[best]) for e, row in zip(current, table)]
+
+    def assign():
+        return [
+            min(range(0, len(chosen)), key=lambda j: row[chosen[j]]) for row in table
+        ]
+
+    for step in range(0, KMEDOIDS_ROUNDS):
+        assigned = assign()
+        moved = False
+        for j in range(0, len(chosen)):
+            members = [b for b in range(0, len(table)) if assigned[b] == j]
+            costs = [
+                (
+                    sum(weights[b] * table[b][c] for b in members)
+                    if c == chosen[j] or c not in chosen
+                    else float("inf")
+                )
+                for c in columns
+            ]
+            best = costs.index(min(costs))
+            if costs[best] < costs[chosen[j]]:
+                chosen[j] = best
+                moved = True
+        if not moved:
+            break
+    return chosen, assign()
+
+
+# at most num_colors catalog indices (fewer only if more threads wouldn't
+# lower the error) picked for the opaque pixels of a flat RGBA image, and the
+# slot of the thread used for every pixel (-1 for transparent pixels).
+def pickThreads(rgba, catalog, match_method, num_colors):
+    pixel_bins, histogram = colorHistogram(rgba)
+    if np is not None:
+        used = np.nonzero(histogram[0])[0]
+        weights = histogram[0][used]
+        bin_colors = np.floor(
+            np.stack([histogram[5 + c][used] for c in range(0, 3)], axis=1)
+            / weights[:, None]
+            + 0.5
+        ).astype(np.intp)
+        weights = weights.tolist()
+    else:
+        used = [b for b in range(0, len(histogram[0])) if histogram[0][b] > 0]
+        weights = [histogram[0][b] for b in used]
+        bin_colors = [
+            tuple(
+                int(math.floor(histogram[5 + c][b] / histogram[0][b] + 0.5))
+                for c in range(0, 3)
+            )
+            for b in used
+        ]
+    if len(weights) == 0:
+        return [], array("h", [-1]) * len(pixel_bins)
+    candidates, table = kmedoidsTable(bin_colors, weights, catalog, match_method)
+    chosen, assigned = kmedoidsColumns(table, weights, num_colors)
+    # slots in order of pick, threads no color ended up with are dropped
+    served = sorted(set(assigned))
+    threads = [candidates[chosen[j]] for j in served]
+    slot_of = dict((j, slot) for slot, j in enumerate(served))
+    bin_slots = [-1] * (QUANTIZE_SIDE * QUANTIZE_SIDE * QUANTIZE_SIDE)
+    for b, j in zip(used, assigned):
+        bin_slots[b] = slot_of[j]
+    if np is not None:
+        return threads, np.array(bin_slots + [-1], dtype=np.int16)[pixel_bins]
+    return threads, array("h", [bin_slots[b] if b >= 0 else -1 for b in pixel_bins])
+
+
+# ------------------------------------------------------------------
+# dithering onto the thread palette
+# ------------------------------------------------------------------
+# GIMP dithers to its own palette and the snap to threads afterwards undoes
+# part of it, these dither straight onto the threads of a pattern. Errors
+# are measured in the working space of the match method (Lab for Delta-E
+# and CIEDE2000, OKLab for OKLab, weighted RGB for Perceptive, RGB for
+# Regular):
+#   "floyd-steinberg"  7/16 of the error to the right, 3/16, 5/16 and 1/16
+#                      to the row below
+#   "reduced-bleed"    the same, diffusing only REDUCED_BLEED of the error
+#   "ordered"          8x8 Bayer threshold added to the lightness (L in
+#                      Lab and OKLab, every channel otherwise), no diffusion
+# Names are in the order of the plug-in's dithering option.
+DITHERING = ("none", "floyd-steinberg", "reduced-bleed", "ordered")
+REDUCED_BLEED = 0.75
+# nearest threads inside the dithering loop come from a table with this
+# many bins per axis over the range of the image's colors
+DITHER_LUT_SIDE = 64
+
+
+def bayerMatrix(size):
+    matrix = [[0]]
+    while len(matrix) < size:
+        n = len(matrix)
+        matrix = [
+            [
+                4 * matrix[y % n][x % n] + (0, 2, 3, 1)[y // n * 2 + x // n]
+                for x in range(0, 2 * n)
+            ]
+            for y in range(0, 2 * n)
+        ]
+    return matrix
+
+
+BAYER_8 = bayerMatrix(8)
+
+
+# nearest palette slot of every bin of a DITHER_LUT_SIDE cube spanning
+# low..high, for squared distances in the working space (deltaE for the Lab methods)
+def ditherTable(palette, low, high, match_method):
+    side = DITHER_LUT_SIDE
+    axis = np.arange(side) / float(side - 1)
+    centers = np.stack(
+        np.meshgrid(
+            *[low[c] + axis * (high[c] - low[c]) for c in range(0, 3)], indexing="ij"
+        ),
+        axis=-1,
+    ).reshape(-1, 3)
+    table = np.empty(len(centers), dtype=np.int16)
+    step = max(1, MATCH_CHUNK // len(palette))
+    for start in range(0, len(centers), step):
+        chunk = centers[start : start + step]
+        if match_method in LAB_METHODS:
+            distances = labDistances(chunk, palette, match_method)
+        else:
+            distances = ((chunk[:, None, :] - palette[None, :, :]) ** 2).sum(axis=2)
+        table[start : start + step] = distances.argmin(axis=1)
+    return table
+
+
+# palette slot of every pixel of a flat RGBA image dithered onto threads
+# (catalog indices), -1 for transparent pixels. The nearest thread of every
+# diffused color comes from ditherTable, error diffusion runs along
+# diagonals x + 2y = t: the pixels of one diagonal only take error from
+# earlier ones, so each is a single vectorized step (width + 2 * height in
+# all) and the result is the same as scanning pixel by pixel.
+def ditherPixels(rgba, width, threads, catalog, match_method, method):
+    height = len(rgba) // 4 // width
+    count = width * height
+    if np is None:
+        return ditherPixelsPython(rgba, width, threads, catalog, match_method, method)
+    image = np.asarray(rgba).reshape(count, 4)
+    opaque = image[:, 3] >= ALPHA_THRESHOLD
+    palette = matchPointArray([catalog.color(i) for i in threads], match_method)
+    work = matchPointArray(image[:, 0:3], match_method)
+    points = np.concatenate([work[opaque], palette])
+    low, high = points.min(axis=0), points.max(axis=0)
+    table = ditherTable(palette, low, high, match_method)
+    scale = (DITHER_LUT_SIDE - 1) / np.where(high > low, high - low, 1)
+    side = DITHER_LUT_SIDE
+
+    def nearest(values):
+        bins = np.floor((values - low) * scale + 0.5).astype(np.intp)
+        return table[(bins[:, 0] * side + bins[:, 1]) * side + bins[:, 2]]
+
+    if method == "ordered":
+        y, x = np.divmod(np.arange(count), width)
+        threshold = (np.array(BAYER_8)[y % 8, x % 8] + 0.5) / 64 - 0.5
+        spread = (high - low) / len(threads) ** (1 / 3.0)
+        if match_method in LIGHTNESS_METHODS:
+            spread[1:] = 0
+        grid = nearest(np.clip(work + threshold[:, None] * spread, low, high))
+        grid[~opaque] = -1
+        return grid
+    fraction = REDUCED_BLEED if method == "reduced-bleed" else 1.0
+    # rows padded by a column on both sides and a row below take the error
+    # diffused off the image
+    stride = width + 2
+    buffer = np.zeros(((height + 1) * stride, 3))
+    buffer.reshape(height + 1, stride, 3)[:height, 1 : width + 1] = work.reshape(
+        height, width, 3
+    )
+    grid = np.full(count, -1, dtype=np.int16)
+    for t in range(0, width + 2 * height - 2):
+        y = np.arange(max(0, (t - width + 2) // 2), min(height - 1, t // 2) + 1)
+        x = t - 2 * y
+        q = y * stride + x + 1
+        values = np.clip(buffer[q], low, high)
+        slots = nearest(values)
+        error = (values - palette[slots]) * fraction
+        keep = opaque[y * width + x]
+        error[~keep] = 0
+        grid[y * width + x] = np.where(keep, slots, -1)
+        buffer[q + stride - 1] += error * (3 / 16.0)
+        buffer[q + 1] += error * (7 / 16.0)
+        buffer[q + stride] += error * (5 / 16.0)
+        buffer[q + stride + 1] += error * (1 / 16.0)
+    return grid
+
+
+# ditherPixels without numpy, pixel by pixel and looking bins up in a dict
+def ditherPixelsPython(rgba, width, threads, catalog, match_method, method):
+    height = len(rgba) // 4 // width
+    count = width * height
+    palette = [matchPoint(catalog.color(i), match_method) for i in threads]
+    work, opaque = [], []
+    points = {}
+    for p in range(0, count):
+        rgb = tuple(rgba[p * 4 : p * 4 + 3])
+        if rgb not in points:
+            points[rgb] = matchPoint(rgb, match_method)
+        work.append(points[rgb])
+        opaque.append(rgba[p * 4 + 3] >= ALPHA_THRESHOLD)
+    used = [point for point, keep in zip(work, opaque) if keep] + palette
+    low = [min(point[c] for point in used) for c in range(0, 3)]
+    high = [max(point[c] for point in used) for c in range(0, 3)]
+    side = DITHER_LUT_SIDE
+    scale = [
+        float(side - 1) / (h - l) if h > l else float(side - 1)
+        for l, h in zip(low, high)
+    ]
+    table = {}
+
+    def distance(point, slot):
+        if match_method in LAB_METHODS:
+            return labDistance(point, palette[slot], match_method) ** 2
+        return sum((a - b) ** 2 for a, b in zip(point, palette[slot]))
+
+    def nearest(values):
+        bins = tuple(
+            int(math.floor((values[c] - low[c]) * scale[c] + 0.5)) for c in range(0, 3)
+        )
+        if bins not in table:
+            center = [
+                low[c] + bins[c] / float(side - 1) * (high[c] - low[c])
+                for c in range(0, 3)
+            ]
+            table[bins] = min(
+                range(0, len(palette)), key=lambda slot: distance(center, slot)
+            )
+        return table[bins]
+
+    def clip(values):
+        return [min(max(values[c], low[c]), high[c]) for c in range(0, 3)]
+
+    grid = array("h", [-1]) * count
+    if method == "ordered":
+        spread = [(h - l) / len(threads) ** (1 / 3.0) for l, h in zip(low, high)]
+        if match_method in LIGHTNESS_METHODS:
+            spread[1] = spread[2] = 0
+        for p in range(0, count):
+            if opaque[p]:
+                y, x = divmod(p, width)
+                threshold = (BAYER_8[y % 8][x % 8] + 0.5) / 64 - 0.5
+                grid[p] = nearest(
+                    clip([v + threshold * s for v, s in zip(work[p], spread)])
+                )
+        return grid
+    fraction = REDUCED_BLEED if method == "reduced-bleed" else 1.0
+    stride = width + 2
+    buffer = [[0.0, 0.0, 0.0] for q in range((height + 1) * stride)]
+    for p in range(0, count):
+        y, x = divmod(p, width)
+        buffer[y * stride + x + 1] = list(work[p])
+    for p in range(0, count):
+        if not opaque[p]:
+            continue
+        y, x = divmod(p, width)
+        q = y * stride + x + 1
+        values = clip(buffer[q])
+        slot = grid[p] = nearest(values)
+        error = [(v - c) * fraction for v, c in zip(values, palette[slot])]
+        for target, share in (
+            (q + stride - 1, 3 / 16.0),
+            (q + 1, 7 / 16.0),
+            (q + stride, 5 / 16.0),
+            (q + stride + 1, 1 / 16.0),
+        ):
+            cell = buffer[target]
+            for c in range(0, 3):
+                cell[c] += error[c] * share
+    return grid
+
+
+# threads (and grid slots) of a pattern without the ones no cell uses
+def dropUnusedThreads(threads, grid):
+    counts = countStitches(grid, len(threads))
+    kept = [slot for slot in range(0, len(threads)) if counts[slot] > 0]
+    if len(kept) == len(threads):
+        return threads, grid
+    slot_of = [-1] * len(threads)
+    for new, slot in enumerate(kept):
+        slot_of[slot] = new
+    if np is not None:
+        grid = np.array(slot_of + [-1], dtype=np.int16)[grid]
+    else:
+        grid = array("h", [slot_of[s] if s >= 0 else -1 for s in grid])
+    return [threads[slot] for slot in kept], grid
+
+
+# catalog indices in order of first appearance
+def uniqueThreads(matched):
+    threads = []
+    for m in matched:
+        if m not in threads:
+            threads.append(m)
+    return threads
+
+
+# stitches per thread slot of an index grid (-1 cells are empty), one pass
+def countStitches(grid, num_threads):
+    if np is not None:
+        grid = np.asarray(grid)
+        return np.bincount(grid[grid >= 0], minlength=num_threads).tolist()
+    counts = [0] * num_threads
+    for cell in grid:
+        if cell >= 0:
+            counts[cell] += 1
+    return counts
+
+
+# stitches per thread slot of GIMP indexed layer bytes (bpp 1, or 2 with
+# alpha), counting each colormap index in one pass and folding the colormap
+# into its thread slots. Transparent cells aren't stitched.
+def countIndexedStitches(data, bpp, slots, num_threads):
+    if np is not None:
+        pixels = np.frombuffer(data, dtype=np.uint8).reshape(-1, bpp)
+        if bpp > 1:
+            pixels = pixels[pixels[:, 1] >= ALPHA_THRESHOLD]
+        per_index = np.bincount(pixels[:, 0], minlength=len(slots)).tolist()
+    else:
+        per_index = [0] * 256
+        pixels = array("B", data)
+        for p in range(0, len(pixels), bpp):
+            if bpp == 1 or pixels[p + 1] >= ALPHA_THRESHOLD:
+                per_index[pixels[p]] += 1
+    counts = [0] * num_threads
+    for i in range(0, len(slots)):
+        counts[slots[i]] += per_index[i]
+    return counts
+
+
+# thread slot of every cell of GIMP indexed layer bytes, -1 where transparent
+def indexedGrid(data, bpp, slots):
+    if np is not None:
+        pixels = np.frombuffer(data, dtype=np.uint8).reshape(-1, bpp)
+        grid = np.array(slots, dtype=np.int16)[pixels[:, 0]]
+        if bpp > 1:
+            grid[pixels[:, 1] < ALPHA_THRESHOLD] = -1
+        return grid
+    pixels = array("B", data)
+    grid = array("h")
+    for p in range(0, len(pixels), bpp):
+        if bpp == 1 or pixels[p + 1] >= ALPHA_THRESHOLD:
+            grid.append(slots[pixels[p]])
+        else:
+            grid.append(-1)
+    return grid
+
+
+# one row of a thread's swatch, width pixels of RGB (or RGBA with channels
+# 4). The first thread of a blend takes its share of the strands from the
+# left (rounded down, like the plug-in's selections always were), the second
+# thread the rest.
+def swatchRow(catalog, i, width, channels=3):
+    alpha = bytearray([255] * (channels - 3))
+    first, second = catalog.threadIndices(i)
+    if second < 0:
+        return (bytearray(catalog.color(i)) + alpha) * width
+    split = width * catalog.firstStrands(i) // catalog.total_strands
+    return (bytearray(MASTER_DMC[first][2]) + alpha) * split + (
+        bytearray(MASTER_DMC[second][2]) + alpha
+    ) * (width - split)
+
+
+# "first+second" strands of a blend, empty for a pure DMC color
+def strandSplit(catalog, i):
+    if catalog.threadIndices(i)[1] < 0:
+        return ""
+    first = catalog.firstStrands(i)
+    return str(first) + "+" + str(catalog.total_strands - first)
+
+
+# " [first+second]" label of the thread info, only for blends of 4 or more
+# strands as 2 and 3 strand blends can only be split one way
+def strandInfo(catalog, i):
+    if catalog.total_strands < 4 or catalog.threadIndices(i)[1] < 0:
+        return ""
+    return " [" + strandSplit(catalog, i) + "]"
+
+
+# real life size (inches and cm) of a pattern on aida of the given count
+def fabricSize(hor_stitches, vert_stitches, count):
+    inchx = hor_stitches / float(count)
+    inchy = vert_stitches / float(count)
+    return inchx, inchy, inchx * 2.54, inchy * 2.54
+
+
+def aidaLine(hor_stitches, vert_stitches, count):
+    inchx, inchy, cmx, cmy = fabricSize(hor_stitches, vert_stitches, count)
+    return (
+        "Aida "
+        + str(count)
+        + " count: "
+        + "{:.2f}".format(inchx)
+        + '" by '
+        + "{:.2f}".format(inchy)
+        + '", '
+        + "{:.2f}".format(cmx)
+        + "cm by "
+        + "{:.2f}".format(cmy)
+        + "cm"
+    )
+
+
+def dimensionLine(hor_stitches, vert_stitches, total_stitches, total_cells):
+    return (
+        "Dimension:"
+        + str(int(hor_stitches))
+        + " by "
+        + str(int(vert_stitches))
+        + " ["
+        + str(total_stitches)
+        + " stitches/"
+        + str(total_cells)
+        + " cells]"
+    )
+
+
+# a finished pattern: grid holds, row by row, the slot of the thread used in
+# every cell (-1 for no stitch), threads the catalog index of every slot.
+# Slot u is drawn with SYMBOLS[u].
+class Pattern(object):
+    def __init__(self, catalog, width, height, grid, threads, counts=None):
+        self.catalog = catalog
+        self.width = width
+        self.height = height
+        self.grid = grid
+        self.threads = threads
+        if counts is None:
+            counts = countStitches(grid, len(threads))
+        self.counts = counts
+
+    def colors(self):
+        return [self.catalog.color(t) for t in self.threads]
+
+    # slots of one row of cells as a list
+    def gridRow(self, r):
+        return self.grid[r * self.width : (r + 1) * self.width].tolist()
+
+    # the cells of a rectangle as a pattern of its own with the same threads
+    def crop(self, x, y, width, height):
+        if np is not None:
+            grid = np.asarray(self.grid).reshape(self.height, self.width)
+            grid = np.array(grid[y : y + height, x : x + width], dtype=np.int16).ravel()
+        else:
+            grid = array("h")
+            for r in range(y, y + height):
+                start = r * self.width + x
+                grid.extend(self.grid[start : start + width])
+        return Pattern(self.catalog, width, height, grid, self.threads)
+
+    def totalStitches(self):
+        return sum(self.counts)
+
+    def totalCells(self):
+        return self.width * self.height
+
+    # bill of materials, one dict per thread slot
+    def bom(self):
+        rows = []
+        for u in range(0, len(self.threads)):
+            i = self.threads[u]
+            rows.append(
+                {
+                    "symbol": SYMBOLS[u],
+                    "code": self.catalog.code(i),
+                    "name": self.catalog.name(i),
+                    "rgb": self.catalog.color(i),
+                    "strands": strandSplit(self.catalog, i),
+                    "stitches": self.counts[u],
+                }
+            )
+        return rows
+
+    # everything the thread info image shows, as plain data
+    def bomDocument(self):
+        fabric = []
+        for count in AIDA_COUNTS:
+            inchx, inchy, cmx, cmy = fabricSize(self.width, self.height, count)
+            fabric.append(
+                {
+                    "count": count,
+                    "inches": [round(inchx, 2), round(inchy, 2)],
+                    "cm": [round(cmx, 2), round(cmy, 2)],
+                }
+            )
+        return {
+            "width": self.width,
+            "height": self.height,
+            "total_stitches": self.totalStitches(),
+            "total_cells": self.totalCells(),
+            "fabric": fabric,
+            "threads": self.bom(),
+        }
+
+    # the text of the thread info image
+    def threadInfoLines(self):
+        lines = []
+        for u, row in enumerate(self.bom()):
+            lines.append(
+                str(u + 1)
+                + ".["
+                + row["symbol"]
+                + "] "
+                + row["code"]
+                + " "
+                + row["name"]
+                + strandInfo(self.catalog, self.threads[u])
+                + " ["
+                + str(row["stitches"])
+                + " stitches]"
+            )
+        lines.append(
+            dimensionLine(
+                self.width, self.height, self.totalStitches(), self.totalCells()
+            )
+        )
+        for count in AIDA_COUNTS:
+            lines.append(aidaLine(self.width, self.height, count))
+        return lines
+
+
+# bill of materials files, written straight from the pattern without
+# rendering the thread info image
+def saveBomJSON(path, pattern):
+    with open(path, "w") as bom_file:
+        json.dump(pattern.bomDocument(), bom_file, indent=1, sort_keys=True)
+        bom_file.write("\n")
+
+
+# one row per thread, then the totals, dimensions and fabric sizes below a
+# blank row
+def saveBomCSV(path, pattern):
+    if sys.version_info[0] < 3:
+        bom_file = open(path, "wb")
+    else:
+        bom_file = open(path, "w", newline="", encoding="utf-8")
+    with bom_file:
+        writer = csv.writer(bom_file)
+        document = pattern.bomDocument()
+        writer.writerow(
+            ["#", "symbol", "code", "name", "r", "g", "b", "strands", "stitches"]
+        )
+        for u, row in enumerate(document["threads"]):
+            writer.writerow(
+                [u + 1, row["symbol"], row["code"], row["name"]]
+                + list(row["rgb"])
+                + [row["strands"], row["stitches"]]
+            )
+        writer.writerow([])
+        writer.writerow(["dimension", document["width"], document["height"]])
+        writer.writerow(["stitches", document["total_stitches"]])
+        writer.writerow(["cells", document["total_cells"]])
+        for fabric in document["fabric"]:
+            writer.writerow(
+                ["aida %d" % fabric["count"]] + fabric["inches"] + fabric["cm"]
+            )
+
+
+# vertical stitches for an image scaled to hor_stitches, as the plug-in does.
+# Never less than one stitch either way, even for very wide images.
+def patternSize(width, height, hor_stitches):
+    hor_stitches = max(1, int(hor_stitches))
+    return hor_stitches, max(1, int(height * (float(hor_stitches) / width)))
+
+
+# ways makePattern can pick the colors of a pattern: a QUANTIZERS quantizer
+# followed by matching, or "k-medoids" picking threads directly (pickThreads)
+PALETTE_METHODS = QUANTIZERS + ("k-medoids",)
+
+
+# the whole pipeline: scale to hor_stitches, reduce to num_colors, match
+# against the catalog of the blend mode and build the index grid, dithered
+# onto the threads unless dithering is "none" (see DITHERING).
+def makePattern(
+    pixels,
+    width,
+    height,
+    channels,
+    allow_blend=0,
+    num_colors=8,
+    interpolation=2,
+    match_method=0,
+    hor_stitches=100,
+    catalog=None,
+    quantizer="wu",
+    quantize_lab=False,
+    dithering="none",
+):
+    if catalog is None:
+        catalog = getCatalog(allow_blend)
+    hor_stitches, vert_stitches = patternSize(width, height, hor_stitches)
+    scaled = scalePixels(
+        pixels, width, height, channels, hor_stitches, vert_stitches, interpolation
+    )
+    if quantizer == "k-medoids":
+        threads, grid = pickThreads(scaled, catalog, match_method, num_colors)
+    else:
+        palette, indices = quantizePixels(scaled, num_colors, quantizer, quantize_lab)
+        matched = matchColors(palette, catalog, match_method)
+        threads = uniqueThreads(matched)
+        slots = [threads.index(m) for m in matched]
+        if np is not None:
+            grid = np.where(indices >= 0, np.array(slots + [-1])[indices], -1).astype(
+                np.int16
+            )
+        else:
+            grid = array("h", [slots[i] if i >= 0 else -1 for i in indices])
+    if dithering != "none" and threads:
+        grid = ditherPixels(
+            scaled, hor_stitches, threads, catalog, match_method, dithering
+        )
+        threads, grid = dropUnusedThreads(threads, grid)
+    return Pattern(catalog, hor_stitches, vert_stitches, grid, threads)
+
+
+# ------------------------------------------------------------------
+# chart rendering
+# ------------------------------------------------------------------
+
+# pixels per stitch of the rendered chart, as in the plug-in
+STITCH_DIMENSION = 30
+
+# opacity of the white overlay that makes black symbols stand out
+WHITE_OVERLAY = 0.3
+
+
+def overlayColor(rgb):
+    return tuple(
+        int(math.floor(c * (1 - WHITE_OVERLAY) + 255 * WHITE_OVERLAY + 0.5))
+        for c in rgb
+    )
+
+
+# grid color of every pixel position along one axis of the chart: the dark
+# square grid (2 pixels wide every stitches_per_square stitches) wins over
+# the light stitch grid (1 pixel wide around every stitch), None for no line.
+def gridLines(
+    size, cell_size, stitches_per_square, square_grid_color, stitch_grid_color
+):
+    lines = []
+    for position in range(0, size):
+        if position % (cell_size * stitches_per_square) < 2:
+            lines.append(tuple(square_grid_color))
+        elif position % cell_size < 1:
+            lines.append(tuple(stitch_grid_color))
+        else:
+            lines.append(None)
+    return lines
+
+
+# the chart of a pattern (cell colors under the white overlay plus stitch and
+# square grids) as RGB byte rows, one pixel row at a time so a caller can
+# stream it to a file without holding the whole image.
+def chartRows(
+    pattern,
+    cell_size=STITCH_DIMENSION,
+    stitches_per_square=10,
+    square_grid_color=(0, 0, 0),
+    stitch_grid_color=(128, 128, 128),
+):
+    width = pattern.width * cell_size
+    cells = [bytearray(overlayColor(rgb)) * cell_size for rgb in pattern.colors()]
+    empty = bytearray([255, 255, 255]) * cell_size
+    columns = gridLines(
+        width, cell_size, stitches_per_square, square_grid_color, stitch_grid_color
+    )
+    column_lines = [(x, bytearray(c)) for x, c in enumerate(columns) if c is not None]
+    square_columns = [
+        (x, c) for x, c in column_lines if tuple(c) == tuple(square_grid_color)
+    ]
+    rows = gridLines(
+        pattern.height * cell_size,
+        cell_size,
+        stitches_per_square,
+        square_grid_color,
+        stitch_grid_color,
+    )
+    for r in range(0, pattern.height):
+        base = bytearray().join(
+            cells[cell] if cell >= 0 else empty for cell in pattern.gridRow(r)
+        )
+        for x, color in column_lines:
+            base[x * 3 : x * 3 + 3] = color
+        base = bytes(base)
+        for y in range(r * cell_size, (r + 1) * cell_size):
+            if rows[y] is None:
+                yield base
+                continue
+            line = bytearray(rows[y]) * width
+            if rows[y] != tuple(square_grid_color):
+                for x, color in square_columns:
+                    line[x * 3 : x * 3 + 3] = color
+            yield bytes(line)
+
+
+# a symbol chart stamped from glyph tiles, one tile per thread slot of
+# cell_size x cell_size pixels (channels bytes each) drawn once, then copied
+# into every cell of that slot. grid_rows are the slot rows of the pattern
+# (-1 for empty cells, left blank). Yields one pixel row at a time, so the
+# cost is linear in the number of cells whatever the number of threads.
+def symbolRows(grid_rows, tiles, cell_size=STITCH_DIMENSION, channels=4):
+    row_bytes = cell_size * channels
+    tile_rows = [
+        [bytes(tile[y * row_bytes : (y + 1) * row_bytes]) for y in range(0, cell_size)]
+        for tile in tiles
+    ]
+    # empty cells pick the last tile
+    tile_rows.append([b"\0" * row_bytes] * cell_size)
+    for row in grid_rows:
+        cells = [tile_rows[slot] for slot in row]
+        for y in range(0, cell_size):
+            yield b"".join(cell[y] for cell in cells)
+
+
+# ------------------------------------------------------------------
+# paged output
+# ------------------------------------------------------------------
+
+# stitches per printed page and stitches repeated from the next page
+PAGE_COLUMNS = 60
+PAGE_ROWS = 80
+PAGE_OVERLAP = 2
+
+
+# printable pages of a pattern as (x, y, width, height) stitch rectangles,
+# left to right then top to bottom. Pages start on multiples of
+# stitches_per_square so the square grid lines up across pages, and repeat
+# the first overlap columns/rows of the page after them.
+def pageLayout(
+    width,
+    height,
+    page_columns=PAGE_COLUMNS,
+    page_rows=PAGE_ROWS,
+    overlap=PAGE_OVERLAP,
+    stitches_per_square=10,
+):
+    steps = []
+    for size in (page_columns, page_rows):
+        if size > stitches_per_square:
+            size -= size % stitches_per_square
+        steps.append(max(1, size))
+    pages = []
+    for y in range(0, height, steps[1]):
+        for x in range(0, width, steps[0]):
+            pages.append(
+                (
+                    x,
+                    y,
+                    min(steps[0] + overlap, width - x),
+                    min(steps[1] + overlap, height - y),
+                )
+            )
+    return pages
+
+
+# patterns saved for rendering pages in other processes. Little-endian:
+#   header  magic, format version, width, height, number of threads
+#   int32   catalog index of every thread slot
+#   int32   stitches of every thread slot
+#   int16   slot of every cell, row by row (-1 for empty)
+# Loading memory-maps the grid, so a page only reads its own rows.
+PATTERN_MAGIC = b"CSTP"
+PATTERN_VERSION = 1
+PATTERN_HEADER = struct.Struct("<4sHIII")
+
+
+def savePattern(path, pattern):
+    with open(path, "wb") as pattern_file:
+        pattern_file.write(
+            PATTERN_HEADER.pack(
+                PATTERN_MAGIC,
+                PATTERN_VERSION,
+                pattern.width,
+                pattern.height,
+                len(pattern.threads),
+            )
+        )
+        writeCacheArray(pattern_file, pattern.threads, "<i4", "i")
+        writeCacheArray(pattern_file, pattern.counts, "<i4", "i")
+        writeCacheArray(pattern_file, pattern.grid, "<i2", "h")
+
+
+def loadPattern(path, catalog):
+    with open(path, "rb") as pattern_file:
+        magic, version, width, height, num_threads = PATTERN_HEADER.unpack(
+            pattern_file.read(PATTERN_HEADER.size)
+        )
+        if magic != PATTERN_MAGIC or version != PATTERN_VERSION:
+            raise ValueError("not a pattern file: " + path)
+        arrays = []
+        for block in ("threads", "counts"):
+            data = array("i")
+            data.fromfile(pattern_file, num_threads)
+            if sys.byteorder == "big":
+                data.byteswap()
+            arrays.append(data.tolist())
+        if np is not None:
+            grid = np.memmap(path, "<i2", "r", pattern_file.tell(), (width * height,))
+        else:
+            grid = array("h")
+            grid.fromfile(pattern_file, width * height)
+            if sys.byteorder == "big":
+                grid.byteswap()
+    return Pattern(catalog, width, height, grid, arrays[0], arrays[1])
+
+
+# ------------------------------------------------------------------
+# vector charts
+# ------------------------------------------------------------------
+
+
+def writeUTF8(out, text):
+    if not isinstance(text, bytes):
+        text = text.encode("utf-8")
+    out.write(text)
+
+
+def hexColor(rgb):
+    return "#%02x%02x%02x" % tuple(rgb)
+
+
+# grid line positions along one axis as (position, is a square line), square
+# lines every stitches_per_square stitches and stitch lines in between
+def vectorGridLines(size, stitches_per_square):
+    return [(p, p % stitches_per_square == 0) for p in range(0, size + 1)]
+
+
+# the chart as SVG written to out (a binary file) as it is generated. Every
+# thread slot is defined once (cell fill under the white overlay plus its
+# symbol) and each cell is a <use> of it, so the file grows with the number of
+# cells, not pixels. One user unit is one stitch, cell_size pixels wide.
+def svgChart(
+    pattern,
+    out,
+    cell_size=STITCH_DIMENSION,
+    stitches_per_square=10,
+    square_grid_color=(0, 0, 0),
+    stitch_grid_color=(128, 128, 128),
+):
+    width, height = pattern.width, pattern.height
+    writeUTF8(
+        out,
+        '<?xml version="1.0" encoding="UTF-8"?>\n'
+        '<svg xmlns="http://www.w3.org/2000/svg" '
+        'xmlns:xlink="http://www.w3.org/1999/xlink" '
+        'width="%d" height="%d" viewBox="0 0 %d %d">\n<defs>\n'
+        % (width * cell_size, height * cell_size, width, height),
+    )
+    for u, rgb in enumerate(pattern.colors()):
+        writeUTF8(
+            out,
+            '<g id="t%d"><rect width="1" height="1" fill="%s"/>'
+            '<text x="0.5" y="0.75" font-size="0.7" text-anchor="middle" '
+            'font-family="Tahoma, sans-serif">' % (u, hexColor(overlayColor(rgb))),
+        )
+        writeUTF8(out, SYMBOLS[u])
+        writeUTF8(out, "</text></g>\n")
+    writeUTF8(
+        out,
+        '</defs>\n<rect width="%d" height="%d" fill="#ffffff"/>\n' % (width, height),
+    )
+    for r in range(0, height):
+        writeUTF8(
+            out,
+            "".join(
+                '<use xlink:href="#t%d" x="%d" y="%d"/>' % (slot, x, r)
+                for x, slot in enumerate(pattern.gridRow(r))
+                if slot >= 0
+            )
+            + "\n",
+        )
+    # light grid first so the dark grid is drawn over it
+    for square, color, line_width in (
+        (False, stitch_grid_color, 1.0),
+        (True, square_grid_color, 2.0),
+    ):
+        writeUTF8(
+            out,
+            '<path fill="none" stroke="%s" stroke-width="%g" d="'
+            % (hexColor(color), line_width / cell_size),
+        )
+        for y, is_square in vectorGridLines(height, stitches_per_square):
+            if is_square == square:
+                writeUTF8(out, "M0 %dH%d" % (y, width))
+        for x, is_square in vectorGridLines(width, stitches_per_square):
+            if is_square == square:
+                writeUTF8(out, "M%d 0V%d" % (x, height))
+        writeUTF8(out, '"/>\n')
+    writeUTF8(out, "</svg>\n")
+
+
+# Helvetica widths (1/1000 em) of the hex labels the PDF chart uses
+HELVETICA_WIDTHS = dict(
+    zip("0123456789ABCDEF", [556] * 10 + [667, 667, 722, 722, 667, 611])
+)
+# legend pages of the PDF chart: A4 in points, margin and height of a row
+LEGEND_PAGE = (595, 842)
+LEGEND_MARGIN = 36
+LEGEND_ROW = 18
+
+
+# hex label of thread slot u in the PDF chart, SYM2[u] for the first 256
+def pdfLabel(u):
+    return "%X" % u
+
+
+# text as a PDF literal string for Helvetica (WinAnsiEncoding)
+def pdfString(text):
+    text = text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+    return "(" + text.encode("latin-1", "replace").decode("latin-1") + ")"
+
+
+# binary file wrapper counting the bytes written, for PDF cross references
+class CountingWriter(object):
+    def __init__(self, out):
+        self.out = out
+        self.offset = 0
+
+    def write(self, data):
+        self.out.write(data)
+        self.offset += len(data)
+
+
+# the chart as PDF written to out (a binary file) as it is generated, one PDF
+# page per (x, y, width, height) stitch rectangle of pages (the whole pattern
+# by default, see pageLayout). Every thread slot is a form XObject drawn once
+# per cell. The standard Helvetica font has no glyphs for the symbols, so
+# cells are labelled with hex labels (pdfLabel) instead, and legend pages
+# after the chart list every label with its thread color, DMC code, name and
+# stitches. Page content is deflated as it is written and its length is
+# written after it.
+def pdfChart(
+    pattern,
+    out,
+    pages=None,
+    cell_points=10,
+    stitches_per_square=10,
+    square_grid_color=(0, 0, 0),
+    stitch_grid_color=(128, 128, 128),
+):
+    if pages is None:
+        pages = [(0, 0, pattern.width, pattern.height)]
+    out = CountingWriter(out)
+    offsets = {}
+
+    def startObject(number):
+        offsets[number] = out.offset
+        out.write(("%d 0 obj\n" % number).encode("latin-1"))
+
+    def writeObject(number, text):
+        startObject(number)
+        out.write((text + "\nendobj\n").encode("latin-1"))
+
+    def pdfColor(rgb, operator):
+        return "%.3f %.3f %.3f %s" % (
+            rgb[0] / 255.0,
+            rgb[1] / 255.0,
+            rgb[2] / 255.0,
+            operator,
+        )
+
+    colors = pattern.colors()
+    form_base = 4
+    next_object = form_base + len(colors)
+    out.write(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+    writeObject(1, "<< /Type /Catalog /Pages 2 0 R >>")
+    writeObject(
+        3,
+        "<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica "
+        "/Encoding /WinAnsiEncoding >>",
+    )
+    for u, rgb in enumerate(colors):
+        label = pdfLabel(u)
+        label_width = sum(HELVETICA_WIDTHS[c] for c in label) * 0.55 / 1000
+        content = "%s 0 0 1 1 re f 0 g BT /F1 0.55 Tf %.4f 0.3 Td (%s) Tj ET" % (
+            pdfColor(overlayColor(rgb), "rg"),
+            (1 - label_width) / 2,
+            label,
+        )
+        writeObject(
+            form_base + u,
+            "<< /Type /XObject /Subtype /Form /BBox [0 0 1 1] "
+            "/Resources << /Font << /F1 3 0 R >> >> /Length %d >>\n"
+            "stream\n%s\nendstream" % (len(content), content),
+        )
+    forms = " ".join("/T%d %d 0 R" % (u, form_base + u) for u in range(len(colors)))
+    resources = "<< /XObject << %s >> >>" % forms
+    kids = []
+    for x0, y0, page_width, page_height in pages:
+        page_object, content_object, length_object = range(next_object, next_object + 3)
+        next_object += 3
+        kids.append(page_object)
+        writeObject(
+            page_object,
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            "/Resources %s /Contents %d 0 R >>"
+            % (
+                page_width * cell_points,
+                page_height * cell_points,
+                resources,
+                content_object,
+            ),
+        )
+        startObject(content_object)
+        out.write(
+            (
+                "<< /Length %d 0 R /Filter /FlateDecode >>\nstream\n" % length_object
+            ).encode("latin-1")
+        )
+        stream_start = out.offset
+        compressor = zlib.compressobj()
+        # stitch units with row 0 at the top of the page
+        out.write(
+            compressor.compress(
+                ("%d 0 0 %d 0 0 cm\n" % (cell_points, cell_points)).encode("latin-1")
+            )
+        )
+        for r in range(0, page_height):
+            row = pattern.gridRow(y0 + r)[x0 : x0 + page_width]
+            y = page_height - 1 - r
+            out.write(
+                compressor.compress(
+                    "".join(
+                        "1 0 0 1 %d %d cm /T%d Do 1 0 0 1 %d %d cm\n"
+                        % (x, y, slot, -x, -y)
+                        for x, slot in enumerate(row)
+                        if slot >= 0
+                    ).encode("latin-1")
+                )
+            )
+        for square, color, line_width in (
+            (False, stitch_grid_color, 1.0),
+            (True, square_grid_color, 2.0),
+        ):
+            lines = [
+                pdfColor(color, "RG"),
+                "%g w" % (line_width / STITCH_DIMENSION),
+            ]
+            # lines are squares by their position in the whole pattern
+            for y in range(0, page_height + 1):
+                if ((y0 + page_height - y) % stitches_per_square == 0) == square:
+                    lines.append("0 %d m %d %d l" % (y, page_width, y))
+            for x in range(0, page_width + 1):
+                if ((x0 + x) % stitches_per_square == 0) == square:
+                    lines.append("%d 0 m %d %d l" % (x, x, page_height))
+            lines.append("S\n")
+            out.write(compressor.compress("\n".join(lines).encode("latin-1")))
+        out.write(compressor.flush())
+        stream_length = out.offset - stream_start
+        out.write(b"\nendstream\nendobj\n")
+        writeObject(length_object, "%d" % stream_length)
+    # legend, the chart cell and thread color of every slot with its thread
+    legend_resources = "<< /XObject << %s >> /Font << /F1 3 0 R >> >>" % forms
+    bom = pattern.bom()
+    per_page = (LEGEND_PAGE[1] - 2 * LEGEND_MARGIN) // LEGEND_ROW
+    for start in range(0, len(colors), per_page):
+        page_object, content_object = next_object, next_object + 1
+        next_object += 2
+        kids.append(page_object)
+        writeObject(
+            page_object,
+            "<< /Type /Page /Parent 2 0 R /MediaBox [0 0 %d %d] "
+            "/Resources %s /Contents %d 0 R >>"
+            % (LEGEND_PAGE[0], LEGEND_PAGE[1], legend_resources, content_object),
+        )
+        rows = []
+        for u in range(start, min(start + per_page, len(colors))):
+            y = LEGEND_PAGE[1] - LEGEND_MARGIN - (u - start + 1) * LEGEND_ROW
+            rows.append(
+                "q 14 0 0 14 %d %d cm /T%d Do Q %s %d %d 28 14 re f "
+                "0 g BT /F1 10 Tf %d %d Td %s Tj ET"
+                % (
+                    LEGEND_MARGIN,
+                    y,
+                    u,
+                    pdfColor(colors[u], "rg"),
+                    LEGEND_MARGIN + 20,
+                    y,
+                    LEGEND_MARGIN + 56,
+                    y + 3,
+                    pdfString(
+                        "%s %s%s [%d stitches]"
+                        % (
+                            bom[u]["code"],
+                            bom[u]["name"],
+                            strandInfo(pattern.catalog, pattern.threads[u]),
+                            bom[u]["stitches"],
+                        )
+                    ),
+                )
+            )
+        content = "\n".join(rows)
+        writeObject(
+            content_object,
+            "<< /Length %d >>\nstream\n%s\nendstream" % (len(content), content),
+        )
+    writeObject(
+        2,
+        "<< /Type /Pages /Kids [%s] /Count %d >>"
+        % (" ".join("%d 0 R" % kid for kid in kids), len(kids)),
+    )
+    xref = out.offset
+    lines = ["xref", "0 %d" % next_object, "0000000000 65535 f "]
+    for number in range(1, next_object):
+        lines.append("%010d 00000 n " % offsets[number])
+    lines.append(
+        "trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n"
+        % (next_object, xref)
+    )
+    out.write("\n".join(lines).encode("latin-1"))
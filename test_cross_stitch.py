@@ -0,0 +1,785 @@
+# checks of the GIMP-free engine and the batch runner: python -m pytest, or
+# python -m unittest test_cross_stitch. Without numpy only the pure Python
+# paths are checked.
+import csv
+import io
+import json
+import os
+import random
+import re
+import shutil
+import tempfile
+import unittest
+from xml.etree import ElementTree
+
+import cross_stitch_batch
+import cross_stitch_engine as engine
+
+MATCH_METHODS = range(0, 5)
+needs_numpy = unittest.skipIf(engine.np is None, "needs numpy")
+
+
+# the engine with numpy hidden, so it runs its pure Python paths
+class PurePython(object):
+    def __enter__(self):
+        self.np = engine.np
+        engine.np = None
+
+    def __exit__(self, *exc_info):
+        engine.np = self.np
+
+
+def randomColors(count, seed=1):
+    generator = random.Random(seed)
+    return [tuple(generator.randrange(256) for c in range(0, 3)) for i in range(count)]
+
+
+# pattern of random RGBA pixels, about a fifth of them transparent
+def randomPattern(width, height, num_colors=5, seed=5):
+    generator = random.Random(seed)
+    pixels = bytearray()
+    for i in range(0, width * height):
+        pixels.extend(generator.randrange(256) for c in range(0, 3))
+        pixels.append(0 if generator.random() < 0.2 else 255)
+    return engine.makePattern(
+        bytes(pixels), width, height, 4, num_colors=num_colors, hor_stitches=width
+    )
+
+
+# distance of a color to a catalog color as the match method measures it
+def matchDistance(rgb, thread_rgb, match_method):
+    if match_method == 2:
+        return engine.deltaE(engine.rgb2lab(rgb), engine.rgb2lab(thread_rgb))
+    if match_method == 3:
+        return engine.deltaE2000(engine.rgb2lab(rgb), engine.rgb2lab(thread_rgb))
+    a = engine.matchPoint(rgb, match_method)
+    b = engine.matchPoint(thread_rgb, match_method)
+    return sum((x - y) ** 2 for x, y in zip(a, b))
+
+
+class MatchColorsTest(unittest.TestCase):
+    def checkBruteForce(self, catalog, colors, match_method):
+        matched = engine.matchColors(colors, catalog, match_method)
+        threads = [tuple(int(c) for c in rgb) for rgb in catalog.colors()]
+        for rgb, i in zip(colors, matched):
+            best = min(matchDistance(rgb, t, match_method) for t in threads)
+            found = matchDistance(rgb, threads[i], match_method)
+            self.assertAlmostEqual(found, best, places=6, msg=(rgb, match_method))
+
+    def testBruteForce(self):
+        colors = randomColors(100)
+        for match_method in MATCH_METHODS:
+            self.checkBruteForce(engine.getCatalog(0), colors, match_method)
+
+    def testBruteForcePurePython(self):
+        colors = randomColors(40)
+        with PurePython():
+            for match_method in MATCH_METHODS:
+                self.checkBruteForce(engine.getCatalog(0), colors, match_method)
+
+    @needs_numpy
+    def testLookupTable(self):
+        catalog = engine.getCatalog(0)
+        colors = randomColors(2000)
+        expected = engine.matchColors(colors, catalog, 1)
+        catalog.lookup[1] = engine.buildLookupTable(catalog, 1)
+        self.assertEqual(engine.matchColors(colors, catalog, 1), expected)
+
+
+class MatchColorsTopKTest(unittest.TestCase):
+    def checkTopK(self, catalog, colors, match_method, k):
+        # matchColorsTopK reports plain distances, not squared ones
+        def distance(rgb, thread_rgb):
+            d = matchDistance(rgb, thread_rgb, match_method)
+            return d if match_method in engine.LAB_METHODS else d**0.5
+
+        ranked = engine.matchColorsTopK(colors, catalog, match_method, k)
+        threads = [tuple(int(c) for c in rgb) for rgb in catalog.colors()]
+        for rgb, found in zip(colors, ranked):
+            self.assertEqual(len(found), min(k, len(catalog)))
+            distances = sorted(distance(rgb, t) for t in threads)
+            for (i, d), best in zip(found, distances):
+                self.assertAlmostEqual(d, best, places=4, msg=(rgb, match_method))
+                self.assertAlmostEqual(d, distance(rgb, threads[i]), places=4)
+        return ranked
+
+    def testBruteForce(self):
+        colors = randomColors(30)
+        for match_method in MATCH_METHODS:
+            ranked = self.checkTopK(engine.getCatalog(0), colors, match_method, 5)
+            self.assertEqual(
+                [found[0][0] for found in ranked],
+                list(engine.matchColors(colors, engine.getCatalog(0), match_method)),
+            )
+
+    @needs_numpy
+    def testPurePython(self):
+        catalog = engine.getCatalog(1)
+        colors = randomColors(20, seed=4)
+        for match_method in MATCH_METHODS:
+            expected = engine.matchColorsTopK(colors, catalog, match_method, 8)
+            with PurePython():
+                ranked = engine.matchColorsTopK(colors, catalog, match_method, 8)
+            self.assertEqual(
+                [[i for i, d in found] for found in ranked],
+                [[i for i, d in found] for found in expected],
+                match_method,
+            )
+
+    def testAlternatives(self):
+        catalog = engine.getCatalog(0)
+        self.assertEqual(engine.getAlternatives([], catalog, 1), [])
+        alternatives = engine.getAlternatives([(239, 238, 240)], catalog, 1, k=3)[0]
+        self.assertEqual(len(alternatives), 3)
+        self.assertEqual(alternatives[0], ("1", "White Tin", 0.0))
+        self.assertEqual(
+            [d for code, name, d in alternatives],
+            sorted(d for code, name, d in alternatives),
+        )
+
+
+@needs_numpy
+class PatternParityTest(unittest.TestCase):
+    # twice the stitch count so both paths average exactly the same pixels
+    WIDTH, HEIGHT, STITCHES = 48, 36, 24
+
+    def pattern(self, pixels, catalog, **options):
+        pattern = engine.makePattern(
+            pixels,
+            self.WIDTH,
+            self.HEIGHT,
+            3,
+            num_colors=6,
+            hor_stitches=self.STITCHES,
+            catalog=catalog,
+            **options
+        )
+        return [int(t) for t in pattern.threads], [int(s) for s in pattern.grid]
+
+    def checkParity(self, allow_blend, quantizers, dithering):
+        generator = random.Random(allow_blend)
+        pixels = bytes(
+            bytearray(
+                generator.randrange(256) for i in range(self.WIDTH * self.HEIGHT * 3)
+            )
+        )
+        runs = [
+            dict(match_method=m, quantizer=q, dithering=d)
+            for m in MATCH_METHODS
+            for q in quantizers
+            for d in dithering
+        ]
+        expected = [
+            self.pattern(pixels, engine.getCatalog(allow_blend), **run) for run in runs
+        ]
+        with PurePython():
+            catalog = engine.getCatalog(allow_blend)
+            for run, result in zip(runs, expected):
+                self.assertEqual(self.pattern(pixels, catalog, **run), result, run)
+
+    def testParity(self):
+        self.checkParity(0, engine.PALETTE_METHODS, engine.DITHERING)
+
+    def testParityWithBlends(self):
+        self.checkParity(1, ["k-medoids"], ["none"])
+
+
+class PatternSizeTest(unittest.TestCase):
+    def testSizes(self):
+        self.assertEqual(engine.patternSize(640, 480, 100), (100, 75))
+        self.assertEqual(engine.patternSize(100, 1, 10), (10, 1))
+        self.assertEqual(engine.patternSize(1, 100, 0), (1, 100))
+
+    def testWideImage(self):
+        pattern = engine.makePattern(bytes(bytearray(300)), 100, 1, 3, hor_stitches=10)
+        self.assertEqual((pattern.width, pattern.height), (10, 1))
+
+
+class QuantizeTest(unittest.TestCase):
+    # mostly dark gradient, where RGB and Lab errors disagree most
+    def gradient(self):
+        generator = random.Random(3)
+        pixels = bytearray()
+        for i in range(0, 3000):
+            t = generator.random()
+            pixels.extend([int(255 * t**3), int(255 * t**2), int(255 * t)])
+        return engine.toRGBA(bytes(pixels), 3000, 1, 3)
+
+    def testLab(self):
+        for quantizer in engine.QUANTIZERS:
+            rgb = engine.quantizePixels(self.gradient(), 6, quantizer)[0]
+            lab = engine.quantizePixels(self.gradient(), 6, quantizer, True)[0]
+            self.assertEqual(len(lab), 6)
+            self.assertNotEqual(sorted(rgb), sorted(lab), quantizer)
+
+    def testMedianCutLab(self):
+        rgb = engine.quantizePixels(self.gradient(), 6, "median-cut")[0]
+        lab = engine.quantizePixels(self.gradient(), 6, "median-cut", True)[0]
+        # Lab errors leave more colors for the dark end
+        self.assertGreater(
+            len([c for c in lab if sum(c) < 100]), len([c for c in rgb if sum(c) < 100])
+        )
+
+    @needs_numpy
+    def testPurePython(self):
+        for quantizer in engine.QUANTIZERS:
+            for lab in (False, True):
+                palette, labels = engine.quantizePixels(
+                    self.gradient(), 6, quantizer, lab
+                )
+                with PurePython():
+                    expected = engine.quantizePixels(self.gradient(), 6, quantizer, lab)
+                self.assertEqual(palette, expected[0])
+                self.assertEqual(labels.tolist(), list(expected[1]))
+
+
+class CountIndexedStitchesTest(unittest.TestCase):
+    # GIMP indexed layer bytes of 500 cells with a colormap of 7 entries
+    def layer(self, bpp):
+        generator = random.Random(bpp)
+        data = bytearray()
+        for i in range(0, 500):
+            data.append(generator.randrange(7))
+            if bpp == 2:
+                data.append(generator.choice([0, engine.ALPHA_THRESHOLD - 1, 200, 255]))
+        return bytes(data)
+
+    def expected(self, data, bpp, slots, num_threads):
+        counts = [0] * num_threads
+        data = bytearray(data)
+        for p in range(0, len(data), bpp):
+            if bpp == 1 or data[p + 1] >= engine.ALPHA_THRESHOLD:
+                counts[slots[data[p]]] += 1
+        return counts
+
+    def testCounts(self):
+        # colormap entries 2 and 5 share a thread slot, slot 3 is never used
+        slots = [0, 1, 2, 4, 1, 2, 0]
+        for bpp in (1, 2):
+            data = self.layer(bpp)
+            expected = self.expected(data, bpp, slots, 5)
+            self.assertEqual(engine.countIndexedStitches(data, bpp, slots, 5), expected)
+            with PurePython():
+                self.assertEqual(
+                    engine.countIndexedStitches(data, bpp, slots, 5), expected
+                )
+            self.assertEqual(expected[3], 0)
+            if bpp == 1:
+                self.assertEqual(sum(expected), 500)
+            else:
+                self.assertLess(sum(expected), 500)
+
+
+class ThreadInfoTest(unittest.TestCase):
+    # swatch widths of the first thread and labels the plug-in always drew
+    def testBlends(self):
+        expected = {
+            1: {1: (50, "")},
+            2: {1: (33, "")},
+            3: {1: (25, " [1+3]"), 2: (50, " [2+2]")},
+            4: {1: (20, " [1+4]"), 2: (40, " [2+3]")},
+            5: {1: (16, " [1+5]"), 2: (33, " [2+4]"), 3: (50, " [3+3]")},
+        }
+        for allow_blend, shares in expected.items():
+            catalog = engine.getCatalog(allow_blend)
+            found = {}
+            for i in range(0, len(catalog)):
+                first, second = catalog.threadIndices(i)
+                if second < 0 or first == second:
+                    continue
+                row = engine.swatchRow(catalog, i, 100)
+                width = 0
+                while row[width * 3 : width * 3 + 3] == bytearray(
+                    engine.MASTER_DMC[first][2]
+                ):
+                    width += 1
+                found[catalog.firstStrands(i)] = (
+                    width,
+                    engine.strandInfo(catalog, i),
+                )
+            self.assertEqual(found, shares, allow_blend)
+
+    def testSingleThread(self):
+        catalog = engine.getCatalog(3)
+        self.assertEqual(engine.strandInfo(catalog, 0), "")
+        self.assertEqual(engine.strandSplit(catalog, 0), "")
+        self.assertEqual(
+            engine.swatchRow(catalog, 0, 2, 4),
+            (bytearray(catalog.color(0)) + bytearray([255])) * 2,
+        )
+
+
+class BomTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        generator = random.Random(6)
+        pixels = bytes(bytearray(generator.randrange(256) for i in range(30 * 20 * 3)))
+        self.pattern = engine.makePattern(
+            pixels, 30, 20, 3, allow_blend=3, num_colors=8, hor_stitches=30
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def testBom(self):
+        bom = self.pattern.bom()
+        self.assertEqual(len(bom), len(self.pattern.threads))
+        self.assertEqual(sum(row["stitches"] for row in bom), 30 * 20)
+        for u, row in enumerate(bom):
+            i = self.pattern.threads[u]
+            self.assertEqual(row["symbol"], engine.SYMBOLS[u])
+            self.assertEqual(row["code"], self.pattern.catalog.code(i))
+            self.assertEqual(
+                row["strands"], engine.strandSplit(self.pattern.catalog, i)
+            )
+
+    def testJSON(self):
+        path = os.path.join(self.directory, "bom.json")
+        engine.saveBomJSON(path, self.pattern)
+        with open(path) as bom_file:
+            document = json.load(bom_file)
+        self.assertEqual((document["width"], document["height"]), (30, 20))
+        self.assertEqual(document["total_stitches"], 30 * 20)
+        self.assertEqual(sum(row["stitches"] for row in document["threads"]), 30 * 20)
+        self.assertEqual(
+            [row["code"] for row in document["threads"]],
+            [row["code"] for row in self.pattern.bom()],
+        )
+        self.assertEqual(
+            [fabric["count"] for fabric in document["fabric"]],
+            list(engine.AIDA_COUNTS),
+        )
+
+    def testCSV(self):
+        path = os.path.join(self.directory, "bom.csv")
+        engine.saveBomCSV(path, self.pattern)
+        with io.open(path, newline="", encoding="utf-8") as bom_file:
+            rows = list(csv.reader(bom_file))
+        threads = rows[1 : rows.index([])]
+        self.assertEqual(len(threads), len(self.pattern.threads))
+        self.assertEqual(sum(int(row[-1]) for row in threads), 30 * 20)
+        for row, expected in zip(threads, self.pattern.bom()):
+            self.assertEqual(
+                row[1:4], [expected["symbol"], expected["code"], expected["name"]]
+            )
+            self.assertEqual(row[4:7], [str(c) for c in expected["rgb"]])
+        self.assertIn(["stitches", str(30 * 20)], rows)
+        self.assertIn(["dimension", "30", "20"], rows)
+
+
+class ThreadDistancesTest(unittest.TestCase):
+    METRICS = (engine.BOX_METRIC, 1, 2)
+
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_dir = engine.CACHE_DIR
+        engine.CACHE_DIR = self.directory
+        self.colors = [tuple(entry[2]) for entry in engine.MASTER_DMC]
+
+    def tearDown(self):
+        engine.CACHE_DIR = self.cache_dir
+        shutil.rmtree(self.directory)
+
+    def distance(self, i, j, metric):
+        if metric == engine.BOX_METRIC:
+            return max(abs(a - b) for a, b in zip(self.colors[i], self.colors[j]))
+        # Delta-E isn't symmetric, the matrix keeps the larger direction
+        if metric in engine.LAB_METHODS:
+            return max(
+                matchDistance(self.colors[i], self.colors[j], metric),
+                matchDistance(self.colors[j], self.colors[i], metric),
+            )
+        return matchDistance(self.colors[i], self.colors[j], metric) ** 0.5
+
+    def testQueries(self):
+        generator = random.Random(7)
+        for metric in self.METRICS:
+            distances = engine.getThreadDistances(metric)
+            for i in generator.sample(range(len(self.colors)), 5):
+                expected = [
+                    self.distance(i, j, metric) for j in range(len(self.colors))
+                ]
+                row = list(distances.row(i))
+                for j in range(0, len(self.colors)):
+                    self.assertAlmostEqual(row[j], expected[j], places=3)
+                    self.assertEqual(distances.distance(j, i), row[j])
+                nearest = distances.nearest(i, 6)
+                self.assertNotIn(i, [j for j, d in nearest])
+                self.assertEqual(
+                    [d for j, d in nearest],
+                    sorted(row[j] for j in range(len(row)) if j != i)[0:6],
+                )
+                self.assertEqual(
+                    distances.within(i, 20),
+                    [j for j in range(len(row)) if j != i and row[j] <= 20],
+                )
+            first, second = distances.pairsWithin(10)
+            self.assertEqual(
+                list(zip(list(first), list(second))),
+                [
+                    (i, j)
+                    for i in range(len(self.colors))
+                    for j in range(i + 1, len(self.colors))
+                    if distances.distance(i, j) <= 10
+                ],
+            )
+
+    @needs_numpy
+    def testPurePython(self):
+        for metric in self.METRICS:
+            expected = engine.getThreadDistances(metric)
+            with PurePython():
+                distances = engine.ThreadDistances(
+                    engine.buildThreadDistances(metric), len(self.colors)
+                )
+                self.assertEqual(distances.nearest(3, 5), expected.nearest(3, 5))
+                self.assertEqual(
+                    distances.pairsWithin(8)[1], list(expected.pairsWithin(8)[1])
+                )
+            self.assertTrue(
+                engine.np.allclose(list(distances.distances), expected.distances)
+            )
+
+    def testSubstitutes(self):
+        substitutes = engine.getThreadSubstitutes("310", 2, k=4)
+        self.assertEqual(len(substitutes), 4)
+        self.assertNotIn("310", [code for code, name, d in substitutes])
+        i = [entry[0] for entry in engine.MASTER_DMC].index("310")
+        expected = sorted(
+            self.distance(i, j, 2) for j in range(len(self.colors)) if j != i
+        )
+        for (code, name, d), best in zip(substitutes, expected):
+            self.assertAlmostEqual(d, best, places=4)
+        self.assertRaises(ValueError, engine.getThreadSubstitutes, "no such", 2)
+
+
+class PagesTest(unittest.TestCase):
+    def checkLayout(self, width, height, columns, rows, overlap):
+        pages = engine.pageLayout(width, height, columns, rows, overlap)
+        covered = {}
+        for x, y, page_width, page_height in pages:
+            self.assertEqual((x % columns, y % rows), (0, 0))
+            self.assertEqual(page_width, min(columns + overlap, width - x))
+            self.assertEqual(page_height, min(rows + overlap, height - y))
+            for r in range(y, y + page_height):
+                for c in range(x, x + page_width):
+                    covered[c, r] = covered.get((c, r), 0) + 1
+        self.assertEqual(len(covered), width * height)
+        # only the overlap is printed twice (four times at page corners)
+        for (c, r), times in covered.items():
+            shared_column = c >= columns and c % columns < overlap
+            shared_row = r >= rows and r % rows < overlap
+            self.assertEqual(times, (1 + shared_column) * (1 + shared_row), (c, r))
+
+    def testLayout(self):
+        self.checkLayout(135, 172, 60, 80, 2)
+        self.checkLayout(120, 160, 60, 80, 0)
+        self.checkLayout(7, 5, 60, 80, 2)
+        self.checkLayout(45, 33, 10, 10, 3)
+
+    def testPageSizes(self):
+        # page sizes are rounded down to whole squares of 10 stitches
+        self.assertEqual(
+            engine.pageLayout(70, 10, 65, 10, 0), [(0, 0, 60, 10), (60, 0, 10, 10)]
+        )
+        self.assertEqual(engine.pageLayout(3, 2, 4, 1, 1), [(0, 0, 3, 2), (0, 1, 3, 1)])
+
+    def testCrop(self):
+        pattern = randomPattern(23, 17)
+        grid = [int(slot) for slot in pattern.grid]
+        for x, y, width, height in engine.pageLayout(23, 17, 10, 10, 2):
+            page = pattern.crop(x, y, width, height)
+            expected = [
+                grid[r * 23 + c]
+                for r in range(y, y + height)
+                for c in range(x, x + width)
+            ]
+            self.assertEqual((page.width, page.height), (width, height))
+            self.assertEqual([int(slot) for slot in page.grid], expected)
+            self.assertEqual(page.threads, pattern.threads)
+            self.assertEqual(page.totalStitches(), len([s for s in expected if s >= 0]))
+            with PurePython():
+                self.assertEqual(list(pattern.crop(x, y, width, height).grid), expected)
+
+    def testSavePattern(self):
+        pattern = randomPattern(23, 17)
+        directory = tempfile.mkdtemp()
+        try:
+            path = os.path.join(directory, "pattern.bin")
+            engine.savePattern(path, pattern)
+            loaded = engine.loadPattern(path, pattern.catalog)
+            self.assertEqual((loaded.width, loaded.height), (23, 17))
+            self.assertEqual(
+                [int(t) for t in loaded.threads], [int(t) for t in pattern.threads]
+            )
+            self.assertEqual(loaded.counts, pattern.counts)
+            self.assertEqual(list(loaded.grid), list(pattern.grid))
+            self.assertEqual(loaded.gridRow(16), pattern.gridRow(16))
+            del loaded
+            with open(path, "r+b") as pattern_file:
+                pattern_file.write(b"JUNK")
+            self.assertRaises(ValueError, engine.loadPattern, path, pattern.catalog)
+        finally:
+            shutil.rmtree(directory)
+
+
+class SvgChartTest(unittest.TestCase):
+    def testCells(self):
+        pattern = randomPattern(23, 17)
+        out = io.BytesIO()
+        engine.svgChart(pattern, out)
+        svg = ElementTree.fromstring(out.getvalue())
+        self.assertEqual(svg.get("viewBox"), "0 0 23 17")
+        namespace = "{http://www.w3.org/2000/svg}"
+        href = "{http://www.w3.org/1999/xlink}href"
+        symbols = {}
+        for group in svg.iter(namespace + "g"):
+            symbols[group.get("id")] = group.find(namespace + "text").text
+        self.assertEqual(
+            sorted(symbols.values()), sorted(engine.SYMBOLS[0 : len(pattern.threads)])
+        )
+        cells = {}
+        for use in svg.iter(namespace + "use"):
+            self.assertIn(use.get(href)[1:], symbols)
+            cells[int(use.get("x")), int(use.get("y"))] = int(use.get(href)[2:])
+        expected = {}
+        for r in range(0, 17):
+            for c, slot in enumerate(pattern.gridRow(r)):
+                if slot >= 0:
+                    expected[c, r] = slot
+        self.assertEqual(len(list(svg.iter(namespace + "use"))), len(expected))
+        self.assertEqual(cells, expected)
+
+
+class PdfChartTest(unittest.TestCase):
+    def chart(self, pattern):
+        out = io.BytesIO()
+        engine.pdfChart(pattern, out)
+        return out.getvalue()
+
+    def assertValidXref(self, data):
+        start = int(re.search(rb"startxref\s+(\d+)", data).group(1))
+        table = re.match(rb"xref\s+0 (\d+)\s+", data[start:])
+        self.assertIsNotNone(table)
+        entries = data[start + table.end() :]
+        for i in range(1, int(table.group(1))):
+            offset = int(entries[i * 20 : i * 20 + 10])
+            self.assertTrue(data[offset:].startswith(b"%d 0 obj" % i), i)
+
+    def testLegend(self):
+        pattern = engine.makePattern(
+            bytes(bytearray(randomColors(1)[0] * 64)), 8, 8, 3, hor_stitches=8
+        )
+        data = self.chart(pattern)
+        self.assertValidXref(data)
+        row = pattern.bom()[0]
+        self.assertIn(
+            ("%s %s [64 stitches]" % (row["code"], row["name"])).encode("latin-1"),
+            data,
+        )
+
+    def testPages(self):
+        pattern = randomPattern(23, 17)
+        pages = engine.pageLayout(23, 17, 10, 10, 2)
+        out = io.BytesIO()
+        engine.pdfChart(pattern, out, pages)
+        data = out.getvalue()
+        self.assertValidXref(data)
+        # one page per chart page and one legend page
+        self.assertEqual(data.count(b"/Type /Page "), len(pages) + 1)
+        self.assertIn(b"/Count %d" % (len(pages) + 1), data)
+
+    def testManySlots(self):
+        generator = random.Random(2)
+        pixels = bytes(bytearray(generator.randrange(256) for i in range(40 * 20 * 3)))
+        pattern = engine.makePattern(
+            pixels, 40, 20, 3, num_colors=300, hor_stitches=40, quantizer="k-medoids"
+        )
+        self.assertGreater(len(pattern.threads), 256)
+        data = self.chart(pattern)
+        self.assertValidXref(data)
+        self.assertIn(b"(100) Tj", data)
+
+
+class NeighborPairsTest(unittest.TestCase):
+    def setUp(self):
+        self.allow_diff_lab = engine.allow_diff_lab
+
+    def tearDown(self):
+        engine.allow_diff_lab = self.allow_diff_lab
+
+    def bruteForce(self, points, radius, box):
+        pairs = []
+        for i in range(0, len(points)):
+            for j in range(i + 1, len(points)):
+                difference = [abs(a - b) for a, b in zip(points[i], points[j])]
+                if box:
+                    close = max(difference) <= radius
+                else:
+                    close = sum(d * d for d in difference) <= radius * radius
+                if close:
+                    pairs.append((i, j))
+        return pairs
+
+    def checkPairs(self, points, radius, box):
+        expected = self.bruteForce(points, radius, box)
+        first, second = engine.neighborPairs(points, radius, box)
+        self.assertEqual(list(zip(list(first), list(second))), expected)
+        with PurePython():
+            first, second = engine.neighborPairs(points, radius, box)
+        self.assertEqual(list(zip(first, second)), expected)
+
+    def testPairs(self):
+        generator = random.Random(8)
+        points = [
+            tuple(generator.uniform(-60, 100) for c in range(0, 3)) for i in range(300)
+        ]
+        # repeated points and points exactly on cell borders
+        points += [points[0], (0.0, 0.0, 0.0), (25.0, 0.0, 0.0), (50.0, 25.0, 0.0)]
+        for radius in (0, 12.5, 25, 40):
+            for box in (True, False):
+                self.checkPairs(points, radius, box)
+        self.checkPairs(randomColors(200), 50, True)
+
+    def testLabBlends(self):
+        engine.allow_diff_lab = 10
+        lab = [engine.rgb2lab(entry[2]) for entry in engine.MASTER_DMC]
+        expected = self.bruteForce(lab, 10, False)
+        first, second = engine.blendPairs()
+        self.assertEqual(list(zip(list(first), list(second))), expected)
+        self.assertNotEqual(expected, self.bruteForce(lab, 10, True))
+        catalog = engine.getStrandBlends(2)
+        self.assertGreater(len(catalog), len(engine.MASTER_DMC))
+        for i in range(len(engine.MASTER_DMC), len(catalog)):
+            self.assertIn(tuple(sorted(catalog.threadIndices(i))), expected)
+        with PurePython():
+            first, second = engine.blendPairs()
+            self.assertEqual(list(zip(first, second)), expected)
+            pure = engine.getStrandBlends(2)
+        self.assertEqual(list(pure.colors()), list(catalog.colors()))
+        # catalogs of both kinds of blend pairs are cached apart
+        path = engine.catalogCachePath(1)
+        engine.allow_diff_lab = None
+        self.assertNotEqual(engine.catalogCachePath(1), path)
+
+
+class CatalogCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.cache_dir = engine.CACHE_DIR
+        engine.CACHE_DIR = self.directory
+
+    def tearDown(self):
+        engine.CACHE_DIR = self.cache_dir
+        shutil.rmtree(self.directory)
+
+    def checkRoundTrip(self):
+        catalog = engine.getStrandBlends(2)
+        path = os.path.join(self.directory, "blends.bin")
+        engine.saveCatalogCache(path, catalog)
+        loaded = engine.loadCatalogCache(path)
+        self.assertEqual(len(loaded), len(catalog))
+        self.assertEqual(loaded.total_strands, catalog.total_strands)
+        self.assertEqual(list(loaded.colors()), list(catalog.colors()))
+        for i in range(0, len(catalog), 97):
+            self.assertEqual(loaded.threads[2 * i], catalog.threads[2 * i])
+            self.assertEqual(loaded.threads[2 * i + 1], catalog.threads[2 * i + 1])
+            self.assertEqual(loaded.strands[i], catalog.strands[i])
+        if engine.np is not None:
+            self.assertTrue(
+                engine.np.allclose(loaded.lab, engine.catalogLab(catalog), atol=1e-4)
+            )
+        os.remove(path)
+
+    def testRoundTrip(self):
+        self.checkRoundTrip()
+
+    def testRoundTripPurePython(self):
+        with PurePython():
+            self.checkRoundTrip()
+
+    def testFailedWriteLeavesNothing(self):
+        path = os.path.join(self.directory, "blends.bin")
+
+        def write(cache_file):
+            cache_file.write(b"half")
+            raise IOError("disk full")
+
+        self.assertRaises(IOError, engine.writeCacheFile, path, write)
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def testReplace(self):
+        path = os.path.join(self.directory, "blends.bin")
+        engine.writeCacheFile(path, lambda cache_file: cache_file.write(b"old"))
+        engine.writeCacheFile(path, lambda cache_file: cache_file.write(b"new"))
+        self.assertEqual(os.listdir(self.directory), ["blends.bin"])
+        with open(path, "rb") as cache_file:
+            self.assertEqual(cache_file.read(), b"new")
+
+    def testOtherVersionIsIgnored(self):
+        path = os.path.join(self.directory, "blends.bin")
+        engine.saveCatalogCache(path, engine.getStrandBlends(2))
+        with open(path, "r+b") as cache_file:
+            cache_file.seek(4)
+            cache_file.write(b"\xff\xff")
+        self.assertIsNone(engine.loadCatalogCache(path))
+
+
+class ReadNetpbmTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.directory)
+
+    def read(self, data):
+        path = os.path.join(self.directory, "image.ppm")
+        with open(path, "wb") as image_file:
+            image_file.write(data)
+        return cross_stitch_batch.readNetpbm(path)
+
+    def assertError(self, data, text):
+        with self.assertRaises(ValueError) as raised:
+            self.read(data)
+        self.assertIn(text, str(raised.exception))
+
+    def testImages(self):
+        self.assertEqual(self.read(b"P6\n2 1\n255\nabcdef"), (b"abcdef", 2, 1, 3))
+        self.assertEqual(
+            self.read(b"P5 # gray\n# size\n2 2 255\n\x00\x01\x02\x03"),
+            (b"\x00\x01\x02\x03", 2, 2, 1),
+        )
+
+    def testMalformed(self):
+        for data in (
+            b"",
+            b"junk\n",
+            b"P6",
+            b"P6\n2 1",
+            b"P6\n2 1\n255",
+            b"P6 # comment without an end",
+        ):
+            self.assertError(data, "truncated header")
+        self.assertError(b"P6\n2 1\n255\nabc", "truncated pixel data")
+        self.assertError(b"P3\n1 1\n255\n0 0 0", "only 8-bit binary")
+        self.assertError(b"P6\n1 1\n65535\n" + b"\0" * 6, "only 8-bit binary")
+
+
+class OutputNamesTest(unittest.TestCase):
+    def testClashes(self):
+        jobs = [
+            ("img.png", "a/img.png"),
+            ("img.png", "b/img.png"),
+            ("sub/img.png", "c/sub/img.png"),
+            ("Sub_Img.jpg", "d/Sub_Img.jpg"),
+            ("other.png", "a/other.png"),
+        ]
+        self.assertEqual(
+            sorted(cross_stitch_batch.outputClashes(jobs)),
+            [["a/img.png", "b/img.png"], ["c/sub/img.png", "d/Sub_Img.jpg"]],
+        )
+        self.assertEqual(cross_stitch_batch.outputClashes(jobs[2:3] + jobs[4:]), [])
+
+
+if __name__ == "__main__":
+    unittest.main()